@@ -4,10 +4,17 @@ from sympy import *
 import datetime
 import json
 import math
+import numpy
 import os
 import shutil
 import sys
 
+# h5py is optional (required by 'output h5' card) : python -m pip install --user h5py
+try:
+    import h5py
+except ImportError:
+    h5py = None
+
 #--------------------------------------------------------------------------------------------------
 class Control:
 
@@ -250,17 +257,11 @@ class Control:
             k = 0
             for j in range(reactor.fluid.njun):
                 if reactor.fluid.juntype[j] == 'independent':
-                    f = reactor.fluid.f[j][0]
-                    t = reactor.fluid.t[j][0]
-                    # tuple of from-to pipe id's
-                    f_t = (reactor.fluid.pipeid[f],reactor.fluid.pipeid[t])
-                    try:
-                        # check if the current junction j is present in junflowrate list
-                        indx = reactor.fluid.junflowrate['jun'].index(f_t)
+                    # check if the current junction j is present in junflowrate list
+                    indx = reactor.fluid.ijunflowrate[j]
+                    if indx >= 0:
                         # impose flowrate from the look-up table
                         reactor.fluid.mdoti[k] = self.signal[reactor.fluid.junflowrate['flowrate'][indx]]
-                    except ValueError:
-                        pass
                     k += 1
 
         # signal-dependent pipe: impose temperature
@@ -287,6 +288,7 @@ class Control:
         inp['lookup'] = []
         inp['mat'] = []
         inp['mix'] = []
+        inp['output'] = 'dat'
         inp['p2d'] = []
         inp['pipe'] = []
         inp['signal'] = []
@@ -505,6 +507,16 @@ class Control:
                 elif key == 'nddir':
                     inp['nddir'] = word[1]
                 #--------------------------------------------------------------------------------------
+                # output format of fuel rod temperatures: a text file per axial layer (dat) or a single HDF5 file (h5)
+                elif key == 'output':
+                    if len(word)-1 < 1 or word[1] not in ('dat','h5'):
+                        print('****ERROR: output card should have one value after the keyword: dat (text files) or h5 (HDF5 file).')
+                        sys.exit()
+                    if word[1] == 'h5' and h5py is None:
+                        print('****ERROR: output h5 card requires h5py: python -m pip install --user h5py')
+                        sys.exit()
+                    inp['output'] = word[1]
+                #--------------------------------------------------------------------------------------
                 # thermal-hydraulic pipe without free level
                 elif key == 'pipe':
                     inp['pipe'].append( {'id':word[1], 'type':'normal', 'matid':word[2], 'dhyd':word[3], 'len':word[4], 'dir':word[5], 'areaz':word[6], 'nnodes':int(word[7]), 'signaltemp':''} )
@@ -625,6 +637,9 @@ class Control:
                 #--------------------------------------------------------------------------------------
                 # tolerances (relative and absolute)
                 elif key == 'tol':
+                    if len(word)-1 < 2 or not all(isinstance(w, float) and w > 0 for w in word[1:3]):
+                        print('****ERROR: tol card should have two positive values after the keyword: relative and absolute tolerances.')
+                        sys.exit()
                     inp['tol'] = (word[1],word[2])
 
         # verify that tout present
@@ -675,91 +690,110 @@ class Control:
     #----------------------------------------------------------------------------------------------
     def open_output_files(self, reactor):
 
-        # prepare an output folder
-        path4results = 'output'
-        if os.path.isfile(path4results): os.remove(path4results)
-        if not os.path.isdir(path4results): os.mkdir(path4results)
-        path4results += os.sep + str(datetime.datetime.now())[0:21].replace(' ','-').replace(':','-').replace('.','-')
-        if os.path.isfile(path4results): os.remove(path4results)
-        if not os.path.isdir(path4results): os.mkdir(path4results)
+        # prepare an output folder named by the current time (to 0.1 s) in the 'output' folder
+        if os.path.isfile('output'): os.remove('output')
+        path4results = os.path.join('output', datetime.datetime.now().strftime('%Y-%m-%d-%H-%M-%S-%f')[0:21])
+        os.makedirs(path4results, exist_ok = True)
 
         # copy input files to output folder
         shutil.copyfile('input', path4results + os.sep + 'input')
         shutil.copyfile('input.json', path4results + os.sep + 'input.json')
-        # open files for output
+        # open files for output: results of many time steps are collected in buffers (64 kB per file, which keeps
+        # the memory modest with hundreds of per-pipe and per-layer files) and flushed to disk in a single write
+        # instead of a write per step
+        bufsize = 65536
         fid = []
         if 'signal' in self.input:
-            fid.append(open(path4results + os.sep + 'signal.dat', 'w'))
+            fid.append(open(path4results + os.sep + 'signal.dat', 'w', buffering = bufsize))
             fid[-1].write(' ' + 'time(s)'.ljust(13) + ''.join( [(self.input['signal'][j]['id']).ljust(13) for j in range(len(self.input['signal']))] + [table['f(x)'][0].ljust(13) for table in self.input['lookup']] + [x['sigid'].ljust(13) for x in self.input['boolean']] ) + '\n')
         if 'fluid' in reactor.solve:
-            fid.append(open(path4results + os.sep + 'fluid-mdot.dat', 'w'))
+            fid.append(open(path4results + os.sep + 'fluid-mdot.dat', 'w', buffering = bufsize))
             fid[-1].write(' ' + 'time(s)'.ljust(13) + ''.join([(self.input['junction']['from'][j] +'-' + self.input['junction']['to'][j]).ljust(13) for j in range(reactor.fluid.njuni + reactor.fluid.njund)]) + '\n')
             for i in range(reactor.fluid.npipe):
-                fid.append(open(path4results + os.sep + 'fluid-p-' + reactor.fluid.pipeid[i] + '.dat', 'w'))
+                fid.append(open(path4results + os.sep + 'fluid-p-' + reactor.fluid.pipeid[i] + '.dat', 'w', buffering = bufsize))
                 fid[-1].write(' ' + 'time(s)'.ljust(13) + ''.join([str(j).zfill(4).ljust(13) for j in range(reactor.fluid.pipennodes[i])]) + '\n')
-                fid.append(open(path4results + os.sep + 'fluid-temp-' + reactor.fluid.pipeid[i] + '.dat', 'w'))
+                fid.append(open(path4results + os.sep + 'fluid-temp-' + reactor.fluid.pipeid[i] + '.dat', 'w', buffering = bufsize))
                 fid[-1].write(' ' + 'time(s)'.ljust(13) + ''.join([str(j).zfill(4).ljust(13) for j in range(reactor.fluid.pipennodes[i])]) + '\n')
-                fid.append(open(path4results + os.sep + 'fluid-vel-' + reactor.fluid.pipeid[i] + '.dat', 'w'))
+                fid.append(open(path4results + os.sep + 'fluid-vel-' + reactor.fluid.pipeid[i] + '.dat', 'w', buffering = bufsize))
                 fid[-1].write(' ' + 'time(s)'.ljust(13) + ''.join([str(j).zfill(4).ljust(13) for j in range(reactor.fluid.pipennodes[i])]) + '\n')
-                fid.append(open(path4results + os.sep + 'fluid-re-' + reactor.fluid.pipeid[i] + '.dat', 'w'))
+                fid.append(open(path4results + os.sep + 'fluid-re-' + reactor.fluid.pipeid[i] + '.dat', 'w', buffering = bufsize))
                 fid[-1].write(' ' + 'time(s)'.ljust(13) + ''.join([str(j).zfill(4).ljust(13) for j in range(reactor.fluid.pipennodes[i])]) + '\n')
-                fid.append(open(path4results + os.sep + 'fluid-pr-' + reactor.fluid.pipeid[i] + '.dat', 'w'))
+                fid.append(open(path4results + os.sep + 'fluid-pr-' + reactor.fluid.pipeid[i] + '.dat', 'w', buffering = bufsize))
                 fid[-1].write(' ' + 'time(s)'.ljust(13) + ''.join([str(j).zfill(4).ljust(13) for j in range(reactor.fluid.pipennodes[i])]) + '\n')
-                fid.append(open(path4results + os.sep + 'fluid-pe-' + reactor.fluid.pipeid[i] + '.dat', 'w'))
+                fid.append(open(path4results + os.sep + 'fluid-pe-' + reactor.fluid.pipeid[i] + '.dat', 'w', buffering = bufsize))
                 fid[-1].write(' ' + 'time(s)'.ljust(13) + ''.join([str(j).zfill(4).ljust(13) for j in range(reactor.fluid.pipennodes[i])]) + '\n')
-            fid.append(open(path4results + os.sep + 'fluid-len.dat', 'w'))
+            fid.append(open(path4results + os.sep + 'fluid-len.dat', 'w', buffering = bufsize))
             s = ''
             for i in range(reactor.fluid.npipe):
                 if reactor.fluid.pipetype[i] == 'freelevel':
                     s += str(reactor.fluid.pipeid[i]).ljust(13)
             fid[-1].write(' ' + 'time(s)'.ljust(13) + s + '\n')
         if 'fuelrod' in reactor.solve:
+            if self.input['output'] == 'h5':
+                # fuel and clad temperatures of all fuel rods are written to a single HDF5 file instead of a file per
+                # axial layer: dataset time and datasets fuelrod/<id>/temp of shape (number of time steps, number of
+                # axial layers, number of fuel and clad radial nodes) extended by one row at every time step
+                h5 = h5py.File(path4results + os.sep + 'fuelrod-temp.h5', 'w')
+                h5.create_dataset('time', shape = (0,), maxshape = (None,), dtype = 'f8', chunks = (64,))
+                for i in range(reactor.solid.nfuelrods):
+                    nz = reactor.solid.fuelrod[i].nz
+                    # layers with less radial nodes are padded with nan
+                    nr = max([reactor.solid.fuelrod[i].fuel[j].nr + reactor.solid.fuelrod[i].clad[j].nr for j in range(nz)])
+                    h5.create_dataset('fuelrod/' + self.input['fuelrod'][i]['id'] + '/temp', shape = (0, nz, nr), maxshape = (None, nz, nr), dtype = 'f4', chunks = (64, nz, nr), compression = 'lzf', fillvalue = numpy.nan)
+                fid.append(h5)
             for i in range(reactor.solid.nfuelrods):
-                fid.append(open(path4results + os.sep + 'fuelrod-hgap-' + [x['id'] for x in self.input['fuelrod']][i] + '.dat', 'w'))
+                fid.append(open(path4results + os.sep + 'fuelrod-hgap-' + [x['id'] for x in self.input['fuelrod']][i] + '.dat', 'w', buffering = bufsize))
                 fid[-1].write(' ' + 'time(s)'.ljust(13) + ''.join([('hgap-' + str(j).zfill(3)).ljust(13) for j in range(reactor.solid.fuelrod[i].nz)]) + '\n')
                 for j in range(reactor.solid.fuelrod[i].nz):
-                    fid.append(open(path4results + os.sep + 'fuelrod-temp-' + [x['id'] for x in self.input['fuelrod']][i] + '-' + str(j+1).zfill(3) + '.dat', 'w'))
-                    fid[-1].write(' ' + 'time(s)'.ljust(13) + ''.join([('tempf-' + str(k).zfill(3) + '(K)').ljust(13) for k in range(reactor.solid.fuelrod[i].fuel[j].nr)]) + ''.join([('tempc-' + str(k).zfill(3) + '(K)').ljust(13) for k in range(reactor.solid.fuelrod[i].clad[j].nr)]) + '\n')
+                    if self.input['output'] == 'dat':
+                        fid.append(open(path4results + os.sep + 'fuelrod-temp-' + [x['id'] for x in self.input['fuelrod']][i] + '-' + str(j+1).zfill(3) + '.dat', 'w', buffering = bufsize))
+                        fid[-1].write(' ' + 'time(s)'.ljust(13) + ''.join([('tempf-' + str(k).zfill(3) + '(K)').ljust(13) for k in range(reactor.solid.fuelrod[i].fuel[j].nr)]) + ''.join([('tempc-' + str(k).zfill(3) + '(K)').ljust(13) for k in range(reactor.solid.fuelrod[i].clad[j].nr)]) + '\n')
                     for k in range(reactor.solid.fuelrod[i].fuel[j].nr):
                         if 'fuelgrain' in reactor.solve and i + j + k == 0: 
-                            fid.append(open(path4results + os.sep + 'fuelrod-c1-' + [x['id'] for x in self.input['fuelrod']][i] + '-' + str(j).zfill(3) + '-' + str(k).zfill(3) + '.dat', 'w'))
+                            fid.append(open(path4results + os.sep + 'fuelrod-c1-' + [x['id'] for x in self.input['fuelrod']][i] + '-' + str(j).zfill(3) + '-' + str(k).zfill(3) + '.dat', 'w', buffering = bufsize))
                             fid[-1].write(' ' + 'time(s)'.ljust(13) + ''.join([('c1-' + str(l).zfill(3)).ljust(13) for l in range(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].nr)]) + '\n')
-                            fid.append(open(path4results + os.sep + 'fuelrod-ri-' + [x['id'] for x in self.input['fuelrod']][i] + '-' + str(j).zfill(3) + '-' + str(k).zfill(3) + '.dat', 'w'))
+                            fid.append(open(path4results + os.sep + 'fuelrod-ri-' + [x['id'] for x in self.input['fuelrod']][i] + '-' + str(j).zfill(3) + '-' + str(k).zfill(3) + '.dat', 'w', buffering = bufsize))
                             fid[-1].write(' ' + 'time(s)'.ljust(13) + ''.join([('ri-' + str(l).zfill(3)).ljust(13) for l in range(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].NB)]) + '\n')
-                            fid.append(open(path4results + os.sep + 'fuelrod-cv_irr-' + [x['id'] for x in self.input['fuelrod']][i] + '-' + str(j).zfill(3) + '-' + str(k).zfill(3) + '.dat', 'w'))
+                            fid.append(open(path4results + os.sep + 'fuelrod-cv_irr-' + [x['id'] for x in self.input['fuelrod']][i] + '-' + str(j).zfill(3) + '-' + str(k).zfill(3) + '.dat', 'w', buffering = bufsize))
                             fid[-1].write(' ' + 'time(s)'.ljust(13) + ''.join([('cv_irr-' + str(l).zfill(3)).ljust(13) for l in range(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].NB)]) + '\n')
-                            fid.append(open(path4results + os.sep + 'fuelrod-ci_irr-' + [x['id'] for x in self.input['fuelrod']][i] + '-' + str(j).zfill(3) + '-' + str(k).zfill(3) + '.dat', 'w'))
+                            fid.append(open(path4results + os.sep + 'fuelrod-ci_irr-' + [x['id'] for x in self.input['fuelrod']][i] + '-' + str(j).zfill(3) + '-' + str(k).zfill(3) + '.dat', 'w', buffering = bufsize))
                             fid[-1].write(' ' + 'time(s)'.ljust(13) + ''.join([('ci_irr-' + str(l).zfill(3)).ljust(13) for l in range(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].NB)]) + '\n')
-                            fid.append(open(path4results + os.sep + 'fuelrod-cv_p-' + [x['id'] for x in self.input['fuelrod']][i] + '-' + str(j).zfill(3) + '-' + str(k).zfill(3) + '.dat', 'w'))
+                            fid.append(open(path4results + os.sep + 'fuelrod-cv_p-' + [x['id'] for x in self.input['fuelrod']][i] + '-' + str(j).zfill(3) + '-' + str(k).zfill(3) + '.dat', 'w', buffering = bufsize))
                             fid[-1].write(' ' + 'time(s)'.ljust(13) + ''.join([('cv_p-' + str(l).zfill(3)).ljust(13) for l in range(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].NB)]) + '\n')
-                            fid.append(open(path4results + os.sep + 'fuelrod-bi-' + [x['id'] for x in self.input['fuelrod']][i] + '-' + str(j).zfill(3) + '-' + str(k).zfill(3) + '.dat', 'w'))
+                            fid.append(open(path4results + os.sep + 'fuelrod-bi-' + [x['id'] for x in self.input['fuelrod']][i] + '-' + str(j).zfill(3) + '-' + str(k).zfill(3) + '.dat', 'w', buffering = bufsize))
                             fid[-1].write(' ' + 'time(s)'.ljust(13) + ''.join([('bi-' + str(l).zfill(3)).ljust(13) for l in range(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].NB)]) + '\n')
         if 'htstr' in reactor.solve:
             for i in range(reactor.solid.nhtstr):
-                fid.append(open(path4results + os.sep + 'htstr-temp-' + [x['id'] for x in self.input['htstr']][i] + '.dat', 'w'))
+                fid.append(open(path4results + os.sep + 'htstr-temp-' + [x['id'] for x in self.input['htstr']][i] + '.dat', 'w', buffering = bufsize))
                 fid[-1].write(' ' + 'time(s)'.ljust(13) + ''.join([('temp-' + str(j).zfill(3)).ljust(13) for j in range(reactor.solid.htstr[i].nr)]) + '\n')
         if 'pointkinetics' in reactor.solve:
-            fid.append(open(path4results + os.sep + 'core-power.dat', 'w'))
+            fid.append(open(path4results + os.sep + 'core-power.dat', 'w', buffering = bufsize))
             fid[-1].write(' ' + 'time(s)'.ljust(13) + 'power(-)\n')
-            fid.append(open(path4results + os.sep + 'core-cdnp.dat', 'w'))
+            fid.append(open(path4results + os.sep + 'core-cdnp.dat', 'w', buffering = bufsize))
             fid[-1].write(' ' + 'time(s)'.ljust(13) + ''.join([('cdnp-' + str(i)).ljust(13) for i in range(reactor.core.ndnp)]) + '\n')
         if 'spatialkinetics' in reactor.solve:
             for i in range(reactor.core.niso):
-                fid.append(open(path4results + os.sep + 'core-iso-microxs-' + reactor.core.isoname[i] + '.dat', 'w'))
+                fid.append(open(path4results + os.sep + 'core-iso-microxs-' + reactor.core.isoname[i] + '.dat', 'w', buffering = bufsize))
             for i in range(reactor.core.nmix):
-                fid.append(open(path4results + os.sep + 'core-mix-macroxs-' + reactor.core.mix[i].mixid + '.dat', 'w'))
-            fid.append(open(path4results + os.sep + 'core-k.dat', 'w'))
+                fid.append(open(path4results + os.sep + 'core-mix-macroxs-' + reactor.core.mix[i].mixid + '.dat', 'w', buffering = bufsize))
+            fid.append(open(path4results + os.sep + 'core-k.dat', 'w', buffering = bufsize))
             fid[-1].write(' ' + 'k-direct'.ljust(13) + 'k-adjoint'.ljust(13) + '\n')
-            fid.append(open(path4results + os.sep + 'core-flux.dat', 'w'))
+            fid.append(open(path4results + os.sep + 'core-flux.dat', 'w', buffering = bufsize))
             fid[-1].write(' ' + 'time(s)'.ljust(13) + 'igroup'.ljust(13) + 'iz'.ljust(13) + 'ix'.ljust(13) + 'iy'.ljust(13) + 'flux'.ljust(13) + '\n')
-            fid.append(open(path4results + os.sep + 'core-flux_a.dat', 'w'))
+            fid.append(open(path4results + os.sep + 'core-flux_a.dat', 'w', buffering = bufsize))
             fid[-1].write(' ' + 'time(s)'.ljust(13) + 'igroup'.ljust(13) + 'iz'.ljust(13) + 'ix'.ljust(13) + 'iy'.ljust(13) + 'flux_a'.ljust(13) + '\n')
-            fid.append(open(path4results + os.sep + 'core-pow.dat', 'w'))
+            fid.append(open(path4results + os.sep + 'core-pow.dat', 'w', buffering = bufsize))
             fid[-1].write(' ' + 'time(s)'.ljust(13) + 'iz'.ljust(13) + 'ix'.ljust(13) + 'iy'.ljust(13) + 'pow'.ljust(13) + '\n')
-            fid.append(open(path4results + os.sep + 'core-powxy.dat', 'w'))
+            fid.append(open(path4results + os.sep + 'core-powxy.dat', 'w', buffering = bufsize))
             fid[-1].write(' ' + 'time(s)'.ljust(13) + 'ix'.ljust(13) + 'iy'.ljust(13) + 'pow'.ljust(13) + '\n')
         return fid
 
+    #----------------------------------------------------------------------------------------------
+    # write a row of output file f: time followed by values, formatted with a single format string
+    def write_row(self, f, time, values):
+
+        f.write(('%12.5e ' * (len(values) + 1) + '\n') % (time, *values))
+
     #----------------------------------------------------------------------------------------------
     def print_output_files(self, reactor, fid, time):
 
@@ -768,64 +802,78 @@ class Control:
         indx = 0
         if 'signal' in self.input:
             # signals
-            fid[indx].write('{0:12.5e} '.format(time) + ''.join(['{0:12.5e} '.format(reactor.control.signal[j]) for j in reactor.control.signal]) + '\n')
+            self.write_row(fid[indx], time, list(reactor.control.signal.values()))
             indx += 1
         if 'fluid' in reactor.solve:
             # flowrate in dependent and independent junctions (no internal junctions)
-            fid[indx].write('{0:12.5e} '.format(time) + ''.join(['{0:12.5e} '.format(reactor.fluid.mdot[i]) for i in range(reactor.fluid.njuni + reactor.fluid.njund)]) + '\n')
+            self.write_row(fid[indx], time, reactor.fluid.mdot[:reactor.fluid.njuni + reactor.fluid.njund])
             indx += 1
             for i in range(reactor.fluid.npipe):
-                fid[indx].write('{0:12.5e} '.format(time) + ''.join(['{0:12.5e} '.format(reactor.fluid.p[i][j]) for j in range(reactor.fluid.pipennodes[i])]) + '\n')
+                self.write_row(fid[indx], time, reactor.fluid.p[i][:reactor.fluid.pipennodes[i]])
                 indx += 1
-                fid[indx].write('{0:12.5e} '.format(time) + ''.join(['{0:12.5e} '.format(reactor.fluid.temp[i][j]) for j in range(reactor.fluid.pipennodes[i])]) + '\n')
+                self.write_row(fid[indx], time, reactor.fluid.temp[i][:reactor.fluid.pipennodes[i]])
                 indx += 1
-                fid[indx].write('{0:12.5e} '.format(time) + ''.join(['{0:12.5e} '.format(reactor.fluid.vel[i][j]) for j in range(reactor.fluid.pipennodes[i])]) + '\n')
+                self.write_row(fid[indx], time, reactor.fluid.vel[i][:reactor.fluid.pipennodes[i]])
                 indx += 1
-                fid[indx].write('{0:12.5e} '.format(time) + ''.join(['{0:12.5e} '.format(reactor.fluid.re[i][j]) for j in range(reactor.fluid.pipennodes[i])]) + '\n')
+                self.write_row(fid[indx], time, reactor.fluid.re[i][:reactor.fluid.pipennodes[i]])
                 indx += 1
-                fid[indx].write('{0:12.5e} '.format(time) + ''.join(['{0:12.5e} '.format(reactor.fluid.pr[i][j]) for j in range(reactor.fluid.pipennodes[i])]) + '\n')
+                self.write_row(fid[indx], time, reactor.fluid.pr[i][:reactor.fluid.pipennodes[i]])
                 indx += 1
-                fid[indx].write('{0:12.5e} '.format(time) + ''.join(['{0:12.5e} '.format(reactor.fluid.pe[i][j]) for j in range(reactor.fluid.pipennodes[i])]) + '\n')
+                self.write_row(fid[indx], time, reactor.fluid.pe[i][:reactor.fluid.pipennodes[i]])
                 indx += 1
-            s = ''
-            for i in range(reactor.fluid.npipe):
-                if reactor.fluid.pipetype[i] == 'freelevel':
-                    s += '{0:12.5e} '.format(reactor.fluid.len[i])
-            fid[indx].write('{0:12.5e} '.format(time) + s + '\n')
+            # free-level-volume lengths
+            self.write_row(fid[indx], time, [reactor.fluid.len[i] for i in range(reactor.fluid.npipe) if reactor.fluid.pipetype[i] == 'freelevel'])
             indx += 1
         if 'fuelrod' in reactor.solve:
+            if self.input['output'] == 'h5':
+                # extend HDF5 datasets by one time step
+                h5 = fid[indx]
+                indx += 1
+                n = h5['time'].shape[0]
+                h5['time'].resize(n+1, axis = 0)
+                h5['time'][n] = time
             for i in range(reactor.solid.nfuelrods):
                 # gas gap conductance
-                fid[indx].write('{0:12.5e} '.format(time) + ''.join(['{0:12.5e} '.format(reactor.solid.fuelrod[i].innergas.hgap[j]) for j in range(reactor.solid.fuelrod[i].nz)]) + '\n')
+                self.write_row(fid[indx], time, reactor.solid.fuelrod[i].innergas.hgap)
                 indx += 1
                 # fuel and clad temperatures
+                if self.input['output'] == 'h5':
+                    ds = h5['fuelrod/' + self.input['fuelrod'][i]['id'] + '/temp']
+                    temp = numpy.full(ds.shape[1:], numpy.nan)
+                    for j in range(reactor.solid.fuelrod[i].nz):
+                        nrf = reactor.solid.fuelrod[i].fuel[j].nr
+                        temp[j, :nrf] = reactor.solid.fuelrod[i].fuel[j].temp
+                        temp[j, nrf:nrf+reactor.solid.fuelrod[i].clad[j].nr] = reactor.solid.fuelrod[i].clad[j].temp
+                    ds.resize(n+1, axis = 0)
+                    ds[n] = temp
                 for j in range(reactor.solid.fuelrod[i].nz):
-                    fid[indx].write('{0:12.5e} '.format(time) + ''.join(['{0:12.5e} '.format(reactor.solid.fuelrod[i].fuel[j].temp[k]) for k in range(reactor.solid.fuelrod[i].fuel[j].nr)]) + ''.join(['{0:12.5e} '.format(reactor.solid.fuelrod[i].clad[j].temp[k]) for k in range(reactor.solid.fuelrod[i].clad[j].nr)]) + '\n')
-                    indx += 1
+                    if self.input['output'] == 'dat':
+                        self.write_row(fid[indx], time, list(reactor.solid.fuelrod[i].fuel[j].temp) + list(reactor.solid.fuelrod[i].clad[j].temp))
+                        indx += 1
                     for k in range(reactor.solid.fuelrod[i].fuel[j].nr):
                         if 'fuelgrain' in reactor.solve and i + j + k == 0: 
-                            fid[indx].write('{0:12.5e} '.format(time) + ''.join(['{0:12.5e} '.format(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].c1[l]) for l in range(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].nr)]) + '\n')
+                            self.write_row(fid[indx], time, reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].c1[:reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].nr])
                             indx += 1
-                            fid[indx].write('{0:12.5e} '.format(time) + ''.join(['{0:12.5e} '.format(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].ri[l]) for l in range(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].NB)]) + '\n')
+                            self.write_row(fid[indx], time, reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].ri[:reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].NB])
                             indx += 1
-                            fid[indx].write('{0:12.5e} '.format(time) + ''.join(['{0:12.5e} '.format(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].cv_irr[l]) for l in range(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].NB)]) + '\n')
+                            self.write_row(fid[indx], time, reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].cv_irr[:reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].NB])
                             indx += 1
-                            fid[indx].write('{0:12.5e} '.format(time) + ''.join(['{0:12.5e} '.format(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].ci_irr[l]) for l in range(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].NB)]) + '\n')
+                            self.write_row(fid[indx], time, reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].ci_irr[:reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].NB])
                             indx += 1
-                            fid[indx].write('{0:12.5e} '.format(time) + ''.join(['{0:12.5e} '.format(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].cv_p[l]) for l in range(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].NB)]) + '\n')
+                            self.write_row(fid[indx], time, reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].cv_p[:reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].NB])
                             indx += 1
-                            fid[indx].write('{0:12.5e} '.format(time) + ''.join(['{0:12.5e} '.format(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].bi[l]) for l in range(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].NB)]) + '\n')
+                            self.write_row(fid[indx], time, reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].bi[:reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].NB])
                             indx += 1
         if 'htstr' in reactor.solve:
             for i in range(reactor.solid.nhtstr):
-                fid[indx].write('{0:12.5e} '.format(time) + ''.join(['{0:12.5e} '.format(reactor.solid.htstr[i].temp[k]) for k in range(reactor.solid.htstr[i].nr)]) + '\n')
+                self.write_row(fid[indx], time, reactor.solid.htstr[i].temp)
                 indx += 1
         if 'pointkinetics' in reactor.solve:
             # point kinetics power
-            fid[indx].write('{0:12.5e} '.format(time) + '{0:12.5e} '.format(reactor.core.power) + '\n')
+            self.write_row(fid[indx], time, [reactor.core.power])
             indx += 1
             # point kinetics cdnp
-            fid[indx].write('{0:12.5e} '.format(time) + ''.join(['{0:12.5e} '.format(reactor.core.cdnp[i]) for i in range(reactor.core.ndnp)]) + '\n')
+            self.write_row(fid[indx], time, reactor.core.cdnp)
             indx += 1
         if 'spatialkinetics' in reactor.solve:
             for i in range(reactor.core.niso):
@@ -963,71 +1011,106 @@ class Control:
     #----------------------------------------------------------------------------------------------
     def write_to_y(self, reactor):
 
-        # write list of unknowns to y
+        # walk once through the objects to be solved, write the unknowns to y and build the map of
+        # unknowns used by read_from_y: every map entry is (container, key, slice) for a list of 
+        # unknowns container[key], (container, key, index) for a scalar unknown container[key] or
+        # (array, indexes) for an array of unknowns gathered from y by an array of indexes
         y = []
+        self.ymapvec = []
+        self.ymapsca = []
+        self.ymaparr = []
+        # slices of y occupied by fluid, solid and core unknowns
+        self.yslice = {}
+        # indexes of the first unknowns of the blocks used by Jacobian evaluation
+        self.yindx = {}
+        def add_vec(container, key):
+            n = len(y)
+            y.extend(container[key])
+            self.ymapvec.append((container, key, slice(n, len(y))))
+        def add_sca(container, key, read = True):
+            if read:
+                self.ymapsca.append((container, key, len(y)))
+            y.append(container[key])
+
+        n0 = len(y)
         if 'fluid' in reactor.solve:
             k = 0
             for j in range(reactor.fluid.njun):
                 if reactor.fluid.juntype[j] == 'independent':
-                    # flowrate in independent junctions
-                    y.append(reactor.fluid.mdoti[k])
+                    f = reactor.fluid.f[j][0]
+                    t = reactor.fluid.t[j][0]
+                    # tuple of from-to pipe id's
+                    f_t = (reactor.fluid.pipeid[f],reactor.fluid.pipeid[t])
+                    # flowrate in independent junctions (not read from y if imposed by junflowrate signal)
+                    add_sca(reactor.fluid.mdoti, k, f_t not in reactor.fluid.junflowrate['jun'])
                     k += 1
             for i in range(reactor.fluid.npipe):
                 if reactor.fluid.pipetype[i] == 'freelevel':
                     # free-level-volume length
-                    y.append(reactor.fluid.len[i])
+                    add_sca(reactor.fluid.len, i)
             for i in range(reactor.fluid.npipe):
-                for j in range(reactor.fluid.pipennodes[i]):
-                    # temperature in pipe nodes
-                    y.append(reactor.fluid.temp[i][j])
+                # temperature in pipe nodes
+                self.yindx[('fluidtemp', i)] = len(y)
+                add_vec(reactor.fluid.temp, i)
+        self.yslice['fluid'] = slice(n0, len(y))
+
+        n0 = len(y)
         if 'fuelrod' in reactor.solve:
+            # indexes in y of the unknowns stored in solid.fuel_temp and solid.clad_temp arrays (and of their
+            # time derivatives stored in solid.fuel_dtdt and solid.clad_dtdt arrays)
+            yfuel = []
+            yclad = []
             for i in range(reactor.solid.nfuelrods):
                 for j in range(reactor.solid.fuelrod[i].nz):
                     for k in range(reactor.solid.fuelrod[i].fuel[j].nr):
                         if 'fuelgrain' in reactor.solve and i + j + k == 0: #i+j+k==0 is a temporal condition to solve fuel grain only for one node
+                            fuelgrain = vars(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k])
+                            self.yindx[('fuelgrain', i, j)] = len(y)
                             # fuel grain monoatoms
-                            for l in range(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].nr):
-                                y.append(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].c1[l])
+                            add_vec(fuelgrain, 'c1')
                             # fuel grain bubble radii
-                            for l in range(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].NB):
-                                y.append(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].ri[l])
+                            add_vec(fuelgrain, 'ri')
                             # fuel grain fractional concentration of irradiation-induced uranium vacancies
-                            for l in range(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].NB):
-                                y.append(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].cv_irr[l])
+                            add_vec(fuelgrain, 'cv_irr')
                             # fuel grain fractional concentration of irradiation-induced uranium interstitials
-                            for l in range(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].NB):
-                                y.append(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].ci_irr[l])
+                            add_vec(fuelgrain, 'ci_irr')
                             # fuel grain fractional concentration of uranium vacancies ejected from intragranular as-fabricated pores
-                            for l in range(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].NB):
-                                y.append(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].cv_p[l])
+                            add_vec(fuelgrain, 'cv_p')
                             # fuel grain intragranular bubble concentation
-                            for l in range(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].NB):
-                                y.append(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].bi[l])
-                    for k in range(reactor.solid.fuelrod[i].fuel[j].nr):
-                        # fuel temperature
-                        y.append(reactor.solid.fuelrod[i].fuel[j].temp[k])
-                    for k in range(reactor.solid.fuelrod[i].clad[j].nr):
-                        # clad temperature
-                        y.append(reactor.solid.fuelrod[i].clad[j].temp[k])
+                            add_vec(fuelgrain, 'bi')
+                    # fuel temperature
+                    self.yindx[('fuel', i, j)] = len(y)
+                    yfuel += range(len(y), len(y) + reactor.solid.fuelrod[i].fuel[j].nr)
+                    y.extend(reactor.solid.fuelrod[i].fuel[j].temp)
+                    # clad temperature
+                    self.yindx[('clad', i, j)] = len(y)
+                    yclad += range(len(y), len(y) + reactor.solid.fuelrod[i].clad[j].nr)
+                    y.extend(reactor.solid.fuelrod[i].clad[j].temp)
+            self.yfuel = numpy.array(yfuel, dtype=int)
+            self.yclad = numpy.array(yclad, dtype=int)
+            self.ymaparr.append((reactor.solid.fuel_temp, self.yfuel))
+            self.ymaparr.append((reactor.solid.clad_temp, self.yclad))
         if 'htstr' in reactor.solve:
             for i in range(reactor.solid.nhtstr):
-                for k in range(reactor.solid.htstr[i].nr):
-                    # htstr temperature
-                    y.append(reactor.solid.htstr[i].temp[k])
+                # htstr temperature
+                self.yindx[('htstr', i)] = len(y)
+                add_vec(vars(reactor.solid.htstr[i]), 'temp')
+        self.yslice['solid'] = slice(n0, len(y))
+
+        n0 = len(y)
         if 'pointkinetics' in reactor.solve:
-            y.append(reactor.core.power)
-            for i in range(reactor.core.ndnp):
-                y.append(reactor.core.cdnp[i])
+            self.yindx['power'] = len(y)
+            add_sca(vars(reactor.core), 'power')
+            add_vec(vars(reactor.core), 'cdnp')
         if 'spatialkinetics' in reactor.solve:
             for iz in range(reactor.core.nz):
                 for ix in range(reactor.core.nx):
                     for iy in range(reactor.core.ny):
                         # if (iy, ix, iz) is not a boundary condition node, i.e. not -1 (vac) and not -2 (ref)
                         imix = reactor.core.map['imix'][iz][ix][iy]
-                        if imix >= 0 and any(reactor.core.mix[imix].sigf) > 0:
+                        if imix >= 0:
                             for it in range(reactor.core.nt):
-                                for ig in range(reactor.core.ng):
-                                    y.append(reactor.core.flux[iz][ix][iy][it][ig])
+                                add_vec(reactor.core.flux[iz][ix][iy], it)
             for iz in range(reactor.core.nz):
                 for ix in range(reactor.core.nx):
                     for iy in range(reactor.core.ny):
@@ -1035,110 +1118,19 @@ class Control:
                         imix = reactor.core.map['imix'][iz][ix][iy]
                         if imix >= 0:
                             for it in range(reactor.core.nt):
-                                for im in range(reactor.core.ndnp):
-                                    y.append(reactor.core.cdnp[iz][ix][iy][it][im])
-        return y
+                                add_vec(reactor.core.cdnp[iz][ix][iy], it)
+        self.yslice['core'] = slice(n0, len(y))
+
+        return numpy.array(y, dtype=float)
 
     #----------------------------------------------------------------------------------------------
     def read_from_y(self, reactor, y):
 
-        # read list of unknowns from y
-        indx = 0
-        if 'fluid' in reactor.solve:
-            k = 0
-            for j in range(reactor.fluid.njun):
-                if reactor.fluid.juntype[j] == 'independent':
-                    f = reactor.fluid.f[j][0]
-                    t = reactor.fluid.t[j][0]
-                    # tuple of from-to pipe id's
-                    f_t = (reactor.fluid.pipeid[f],reactor.fluid.pipeid[t])
-                    try:
-                        # check if the current junction j is present in junflowrate list
-                        reactor.fluid.junflowrate['jun'].index(f_t)
-                        # if yes...
-                        pass
-                    except ValueError:
-                        # flowrate in independent junctions
-                        reactor.fluid.mdoti[k] = y[indx]
-                    k += 1
-                    indx += 1
-            for i in range(reactor.fluid.npipe):
-                if reactor.fluid.pipetype[i] == 'freelevel':
-                    # free-level-volume length
-                    reactor.fluid.len[i] = y[indx]
-                    indx += 1
-            for i in range(reactor.fluid.npipe):
-                for j in range(reactor.fluid.pipennodes[i]):
-                    # temperature in pipe nodes
-                    reactor.fluid.temp[i][j] = y[indx]
-                    indx += 1
-        if 'fuelrod' in reactor.solve:
-            for i in range(reactor.solid.nfuelrods):
-                for j in range(reactor.solid.fuelrod[i].nz):
-                    for k in range(reactor.solid.fuelrod[i].fuel[j].nr):
-                        if 'fuelgrain' in reactor.solve and i + j + k == 0:
-                            for l in range(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].nr):
-                                # fuel grain monoatoms
-                                reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].c1[l] = y[indx]
-                                indx += 1
-                            for l in range(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].NB):
-                                # fuel grain bubble radii
-                                reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].rb[l] = y[indx]
-                                indx += 1
-                            for l in range(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].NB):
-                                # fuel grain fractional concentration of irradiation-induced uranium vacancies
-                                reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].cv_irr[l] = y[indx]
-                                indx += 1
-                            for l in range(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].NB):
-                                # fuel grain fractional concentration of irradiation-induced uranium interstitials
-                                reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].ci_irr[l] = y[indx]
-                                indx += 1
-                            for l in range(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].NB):
-                                # fuel grain fractional concentration of uranium vacancies ejected from intragranular as-fabricated pores
-                                reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].cv_p[l] = y[indx]
-                                indx += 1
-                            for l in range(reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].NB):
-                                # fuel grain intragranular bubble concentrations
-                                reactor.solid.fuelrod[i].fuel[j].fuelgrain[k].bi[l] = y[indx]
-                                indx += 1
-                    for k in range(reactor.solid.fuelrod[i].fuel[j].nr):
-                        # fuel temperature
-                        reactor.solid.fuelrod[i].fuel[j].temp[k] = y[indx]
-                        indx += 1
-                    for k in range(reactor.solid.fuelrod[i].clad[j].nr):
-                        # clad temperature
-                        reactor.solid.fuelrod[i].clad[j].temp[k] = y[indx]
-                        indx += 1
-        if 'htstr' in reactor.solve:
-            for i in range(reactor.solid.nhtstr):
-                for k in range(reactor.solid.htstr[i].nr):
-                    # htstr temperature
-                    reactor.solid.htstr[i].temp[k] = y[indx]
-                    indx += 1
-        if 'pointkinetics' in reactor.solve:
-            reactor.core.power = y[indx]
-            indx += 1
-            for i in range(reactor.core.ndnp):
-                reactor.core.cdnp[i] = y[indx]
-                indx += 1
-        if 'spatialkinetics' in reactor.solve:
-            for iz in range(reactor.core.nz):
-                for ix in range(reactor.core.nx):
-                    for iy in range(reactor.core.ny):
-                        # if (iy, ix, iz) is not a boundary condition node, i.e. not -1 (vac) and not -2 (ref)
-                        imix = reactor.core.map['imix'][iz][ix][iy]
-                        if imix >= 0 and any(reactor.core.mix[imix].sigf) > 0:
-                            for it in range(reactor.core.nt):
-                                for ig in range(reactor.core.ng):
-                                    reactor.core.flux[iz][ix][iy][it][ig] = y[indx]
-                                    indx += 1
-            for iz in range(reactor.core.nz):
-                for ix in range(reactor.core.nx):
-                    for iy in range(reactor.core.ny):
-                        # if (iy, ix, iz) is not a boundary condition node, i.e. not -1 (vac) and not -2 (ref)
-                        imix = reactor.core.map['imix'][iz][ix][iy]
-                        if imix >= 0:
-                            for it in range(reactor.core.nt):
-                                for im in range(reactor.core.ndnp):
-                                    reactor.core.cdnp[iz][ix][iy][it][im] = y[indx]
-                                    indx += 1
\ No newline at end of file
+        # read array of unknowns from y using the map built by write_to_y
+        for a, iy in self.ymaparr:
+            a[:] = y[iy]
+        y = y.tolist()
+        for container, key, s in self.ymapvec:
+            container[key][:] = y[s]
+        for container, key, i in self.ymapsca:
+            container[key] = y[i]
\ No newline at end of file
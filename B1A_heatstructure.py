@@ -1,3 +1,34 @@
+from B4_data import ss316
+
+from numba import njit
+
+import math
+import numpy
+import sys
+
+#--------------------------------------------------------------------------------------------------
+# time derivatives of heat structure temperatures compiled by numba: temp is an array of temperatures
+# in heat structure radial nodes, rb and vol are arrays of node boundary radii and node volumes per unit
+# height divided by pi, qleft and qright are heat fluxes times heat transfer area per unit height divided
+# by pi at left and right boundaries; rho, cp, k and dtdt are output arrays of heat structure properties
+# and temperature time derivatives
+@njit(cache=True, fastmath=True)
+def calculate_dtdt(temp, rb, vol, dr, qleft, qright, rho, cp, k, dtdt):
+
+    nr = len(temp)
+    # HEAT STRUCTURE PROPERTIES:
+    for i in range(nr):
+        rho[i], cp[i], k[i] = ss316(temp[i])
+
+    # TIME DERIVATIVE OF HEAT STRUCTURE TEMPERATURE:
+    # heat flux (W/m**2) times heat transfer area per unit height divided by pi at node boundaries (size = nr+1):
+    # qleft at the left boundary, 2*rb * kb * dT/dr with thermal conductivity between nodes kb inside and qright at the right boundary
+    q = numpy.empty(nr+1)
+    q[0] = qleft
+    q[1:nr] = 2*rb*0.5*(k[:-1] + k[1:])*(temp[:-1] - temp[1:])/dr
+    q[nr] = qright
+    dtdt[:] = (q[:-1] - q[1:])/(rho*cp*vol)
+
 #--------------------------------------------------------------------------------------------------
 class HeatStructure:
 
@@ -31,6 +62,9 @@ class HeatStructure:
         mat = reactor.control.input['mat'][ihtstr]
         # material type of heat structure
         self.type = mat['type']
+        if self.type != 'ss316':
+            print('****ERROR: heat structure material id ' + self.matid + ' is of type ' + self.type + ' while only ss316 heat structure is supported.')
+            sys.exit()
 
         # find the heat structure left thermal boundary condition id in the list of thermal boundary conditions
         try:
@@ -49,37 +83,31 @@ class HeatStructure:
             sys.exit()
         # dictionary of right thermal boundary condition of the current heat structure
         self.bcright = reactor.control.input['thermbc'][ihtstr]        
+        # indexes of the pipes and pipe nodes at left and right boundaries (boundary with pipe only)
+        self.jpipeleft = (reactor.fluid.pipeid.index(self.bcleft['pipeid']), self.bcleft['pipenode']-1) if self.bcleft['type'] == 2 else None
+        self.jpiperight = (reactor.fluid.pipeid.index(self.bcright['pipeid']), self.bcright['pipenode']-1) if self.bcright['type'] == 2 else None
 
         # list of initial temperatures in heat structure radial nodes
         self.temp = [mat['temp0']]*self.nr
+        # heat exchange coefficients with coolant at left and right boundaries
+        self.hexleft = 0
+        self.hexright = 0
 
         # mesh grid step
         self.dr = (self.ro - self.ri)/(self.nr-1)
         # list of node radii (size = nr)
         self.r = [self.ri + i*self.dr for i in range(self.nr)]
-        # list of node boundary radii (size = nr-1)
-        self.rb = [self.r[i]+self.dr/2 for i in range(self.nr-1)]
-        # list of node volume per unit height (size = nr)
-        self.vol = [self.rb[0]**2 - self.r[0]**2] + [self.rb[i]**2 - self.rb[i-1]**2 for i in range(1, self.nr-1)] + [self.r[self.nr-1]**2 - self.rb[self.nr-2]**2]
+        # array of node boundary radii (size = nr-1)
+        self.rb = numpy.array([self.r[i]+self.dr/2 for i in range(self.nr-1)])
+        # array of node volume per unit height (size = nr)
+        self.vol = numpy.array([self.rb[0]**2 - self.r[0]**2] + [self.rb[i]**2 - self.rb[i-1]**2 for i in range(1, self.nr-1)] + [self.r[self.nr-1]**2 - self.rb[self.nr-2]**2])
+        # arrays of heat structure properties in radial nodes updated by compose_rhs
+        self.prop = {'rho':numpy.zeros(self.nr), 'cp':numpy.zeros(self.nr), 'k':numpy.zeros(self.nr)}
 
     #----------------------------------------------------------------------------------------------
-    # calculate right-hand side list: self is a 'htstr' object created in B1
-    def compose_rhs(self, reactor, t):
-
-        # HEAT STRUCTURE PROPERTIES:
-        self.prop = {'rho':[], 'cp':[], 'k':[]}
-        for j in range(self.nr):
-            # call material property function
-            pro = reactor.data.matpro( {'type':self.type, 't':self.temp[j]} )
-            # density (kg/m3)
-            self.prop['rho'].append(pro['rho'])
-            # specific heat (J/kg-K)
-            self.prop['cp'].append(pro['cp'])
-            # thermal conductivity (W/m-K)
-            self.prop['k'].append(pro['k'])
-
-        # heat structure thermal conductivity between nodes
-        kb = [0.5*(self.prop['k'][i] + self.prop['k'][i+1]) for i in range(self.nr-1)]
+    # calculate right-hand side array: self is a 'htstr' object created in B1,
+    # out is the slice of the right-hand side array occupied by heat structure temperatures
+    def compose_rhs(self, reactor, t, out):
 
         # left boundary condition
         if self.bcleft['type'] == 0:
@@ -88,7 +116,7 @@ class HeatStructure:
             Qleft = 2*self.r[0]*self.bcleft['alfa']*(self.bcleft['temp'] - self.temp[0]) * self.mltpl
         elif self.bcleft['type'] == 2:
             # pipe node indexes
-            jpipe = (reactor.fluid.pipeid.index(self.bcleft['pipeid']), self.bcleft['pipenode']-1)
+            jpipe = self.jpipeleft
             fluid = {}
             fluid['t'] = reactor.fluid.temp[jpipe[0]][jpipe[1]]
             fluid['type'] = reactor.fluid.type[jpipe[0]]
@@ -98,6 +126,8 @@ class HeatStructure:
             fluid['nu'] = reactor.data.nu( {'pe':fluid['pe']} )
             # heat exchange coefficient
             fluid['hex'] = fluid['nu'] * pro['kl'] / reactor.fluid.dhyd[jpipe[0]]
+            # store heat exchange coefficient for compose_jac
+            self.hexleft = fluid['hex']
             # heat flux (W/m**2) times heat transfer area per unit height divided by pi from clad to coolant
             Qleft = 2*self.r[0]*fluid['hex']*(fluid['t'] - self.temp[0]) * self.mltpl
         else:
@@ -110,7 +140,7 @@ class HeatStructure:
             Qright = -2*self.r[self.nr-1]*self.bcright['alfa']*(self.bcright['temp'] - self.temp[self.nr-1]) * self.mltpl
         elif self.bcright['type'] == 2:
             # pipe node indexes
-            jpipe = (reactor.fluid.pipeid.index(self.bcright['pipeid']), self.bcright['pipenode']-1)
+            jpipe = self.jpiperight
             fluid = {}
             fluid['t'] = reactor.fluid.temp[jpipe[0]][jpipe[1]]
             fluid['type'] = reactor.fluid.type[jpipe[0]]
@@ -120,14 +150,46 @@ class HeatStructure:
             fluid['nu'] = reactor.data.nu( {'pe':fluid['pe']} )
             # heat exchange coefficient
             fluid['hex'] = fluid['nu'] * pro['kl'] / reactor.fluid.dhyd[jpipe[0]]
+            # store heat exchange coefficient for compose_jac
+            self.hexright = fluid['hex']
             # heat flux (W/m**2) times heat transfer area per unit height divided by pi from clad to coolant
             Qright = -2*self.r[self.nr-1]*fluid['hex']*(fluid['t'] - self.temp[self.nr-1]) * self.mltpl
         else:
             Qright = 0
 
-        # list of heat flux (W/m**2) times heat transfer area per unit height at node boundaries: 2*rb * kb * dT/dr (size = nr-1)
-        Q = [Qleft] + [2*self.rb[i]*kb[i]*(self.temp[i] - self.temp[i+1])/self.dr for i in range(self.nr-1)] + [Qright]
-        rhocpv = [self.prop['rho'][i]*self.prop['cp'][i]*self.vol[i] for i in range(self.nr)]
-        dTdt = [(Q[i] - Q[i+1])/rhocpv[i] for i in range(self.nr)]
-        rhs = dTdt
-        return rhs
+        # HEAT STRUCTURE PROPERTIES AND TIME DERIVATIVE OF HEAT STRUCTURE TEMPERATURE:
+        calculate_dtdt(numpy.array(self.temp), self.rb, self.vol, self.dr, Qleft, Qright, self.prop['rho'], self.prop['cp'], self.prop['k'], out)
+
+    #----------------------------------------------------------------------------------------------
+    # fill Jacobian columns of heat structure temperatures: self is a 'htstr' object created in B1
+    # indx is the index of this object in the list of heat structures,
+    # material properties and heat exchange coefficients are taken from the last call of compose_rhs
+    def compose_jac(self, indx, reactor, jac):
+
+        # index of the first heat structure temperature in the array of unknowns
+        iy = reactor.control.yindx[('htstr', indx)]
+
+        # thermal conductance per unit height divided by pi between nodes with heat structure thermal conductivity
+        # between nodes (size = nr-1)
+        g = 2*self.rb*0.5*(self.prop['k'][:-1] + self.prop['k'][1:])/self.dr
+        rhocpv = self.prop['rho']*self.prop['cp']*self.vol
+
+        # derivatives of heat structure temperature time derivatives (frozen material properties): tridiagonal stencil
+        # indexes of temperatures in the array of unknowns
+        iyr = numpy.arange(iy, iy+self.nr)
+        jac[iyr[:-1], iyr[:-1]] -= g/rhocpv[:-1]
+        jac[iyr[:-1], iyr[1:]] += g/rhocpv[:-1]
+        jac[iyr[1:], iyr[1:]] -= g/rhocpv[1:]
+        jac[iyr[1:], iyr[:-1]] += g/rhocpv[1:]
+
+        # boundary conditions: node index, node radius, boundary condition and heat exchange coefficient with coolant
+        for i, r, bc, hex, jpipe in [(0, self.r[0], self.bcleft, self.hexleft, self.jpipeleft), (self.nr-1, self.r[self.nr-1], self.bcright, self.hexright, self.jpiperight)]:
+            if bc['type'] == 1:
+                jac[iy+i][iy+i] -= 2*r*bc['alfa'] * self.mltpl/rhocpv[i]
+            elif bc['type'] == 2:
+                jac[iy+i][iy+i] -= 2*r*hex * self.mltpl/rhocpv[i]
+                # derivative of coolant temperature time derivative
+                if reactor.fluid.signaltemp[jpipe[0]] == '':
+                    dz = abs(reactor.fluid.len[jpipe[0]])/reactor.fluid.pipennodes[jpipe[0]]
+                    rho_cp_vol = reactor.fluid.prop[jpipe[0]]['rhol'][jpipe[1]] * reactor.fluid.prop[jpipe[0]]['cpl'][jpipe[1]] * reactor.fluid.areaz[jpipe[0]] * dz
+                    jac[reactor.control.yindx[('fluidtemp', jpipe[0])] + jpipe[1]][iy+i] += hex * 2*math.pi*r * dz * self.mltpl / rho_cp_vol
@@ -1,8 +1,34 @@
 from B1B0A_fuelgrain import FuelGrain
+from B4_data import mox
+
+from numba import njit
 
 import math
+import numpy
 import sys
 
+#--------------------------------------------------------------------------------------------------
+# time derivatives of fuel temperatures compiled by numba: temp, b, por, pu and x are arrays of 
+# temperatures and mox parameters in fuel radial nodes, rb and vol are arrays of node boundary radii and 
+# node volumes, qgap is heat flux times heat transfer area per unit height from fuel to clad, qv is 
+# power density; rho, cp, k and dtdt are output arrays of fuel properties and temperature time derivatives
+@njit(cache=True, fastmath=True)
+def calculate_dtdt(temp, b, por, pu, x, rb, vol, dr, qgap, qv, rho, cp, k, dtdt):
+
+    nr = len(temp)
+    # FUEL PROPERTIES:
+    for i in range(nr):
+        rho[i], cp[i], k[i] = mox(temp[i], b[i], por[i], pu[i], x[i])
+
+    # TIME DERIVATIVE OF FUEL TEMPERATURE:
+    # heat flux (W/m**2) times heat transfer area per unit height at node boundaries (size = nr+1): zero at the
+    # centre, 2*pi*rb * kb * dT/dr with fuel thermal conductivity between nodes kb inside and qgap at the surface
+    q = numpy.empty(nr+1)
+    q[0] = 0.0
+    q[1:nr] = 2*math.pi*rb*0.5*(k[:-1] + k[1:])*(temp[:-1] - temp[1:])/dr
+    q[nr] = qgap
+    dtdt[:] = (q[:-1] - q[1:] + qv*vol)/(rho*cp*vol)
+
 #--------------------------------------------------------------------------------------------------
 class Fuel:
 
@@ -45,26 +71,31 @@ class Fuel:
         mat = reactor.control.input['mat'][ifuel]
         # material type of fuel
         self.type = mat['type']
-        # list of Pu content in fuel radial nodes
-        self.pu = [mat['pu']]*self.nr
-        # list of fuel burnup in fuel radial nodes
-        self.b = [mat['b']]*self.nr
-        # list of deviation from stoechiometry in fuel radial nodes
-        self.x = [mat['x']]*self.nr
-        # list of porosity in fuel radial nodes
-        self.por = [mat['por']]*self.nr
-        # list of initial temperatures in fuel radial nodes
+        if self.type != 'mox':
+            print('****ERROR: fuel material id ' + matid + ' is of type ' + self.type + ' while only mox fuel is supported.')
+            sys.exit()
+        # array of Pu content in fuel radial nodes
+        self.pu = numpy.full(self.nr, mat['pu'], dtype=float)
+        # array of fuel burnup in fuel radial nodes
+        self.b = numpy.full(self.nr, mat['b'], dtype=float)
+        # array of deviation from stoechiometry in fuel radial nodes
+        self.x = numpy.full(self.nr, mat['x'], dtype=float)
+        # array of porosity in fuel radial nodes
+        self.por = numpy.full(self.nr, mat['por'], dtype=float)
+        # list of initial temperatures in fuel radial nodes (replaced by a view to the solid.fuel_temp array)
         self.temp = [mat['temp0']]*self.nr
 
         # mesh grid step
         self.dr = (self.ro - self.ri)/(self.nr-1)
         # list of node radii (size = nr)
         self.r = [self.ri + i*self.dr for i in range(self.nr)]
-        # list of node boundary radii (size = nr-1)
-        self.rb = [self.r[i]+self.dr/2 for i in range(self.nr-1)]
-        # list of node volume (size = nr)
+        # array of node boundary radii (size = nr-1)
+        self.rb = numpy.array([self.r[i]+self.dr/2 for i in range(self.nr-1)])
+        # array of node volume (size = nr)
         self.vol = [self.rb[0]**2 - self.r[0]**2] + [self.rb[i]**2 - self.rb[i-1]**2 for i in range(1, self.nr-1)] + [self.r[self.nr-1]**2 - self.rb[self.nr-2]**2]       
-        self.vol = [self.vol[i]*math.pi for i in range(self.nr)]
+        self.vol = numpy.array([self.vol[i]*math.pi for i in range(self.nr)])
+        # arrays of fuel properties in radial nodes updated by calculate_fuelrod_dtdt (replaced by views to the solid.fuel_prop arrays)
+        self.prop = {'rho':numpy.zeros(self.nr), 'cp':numpy.zeros(self.nr), 'k':numpy.zeros(self.nr)}
         if 'fuelgrain' in reactor.solve:
             # create an object fuel grain for every radial node of fuel
             self.fuelgrain = []
@@ -72,47 +103,44 @@ class Fuel:
                 self.fuelgrain.append(FuelGrain(i, indx, indxfuelrod, reactor))
 
     #----------------------------------------------------------------------------------------------
-    # create right-hand side list: self is a 'fuel' object created in B1B
-    # indx is the axial index of this object in the fuel rod with index indxfuelrod
-    def calculate_rhs(self, indx, indxfuelrod, reactor, t):
+    # create right-hand side array of fuel grain unknowns: self is a 'fuel' object created in B1B
+    # indx is the axial index of this object in the fuel rod with index indxfuelrod,
+    # out is the slice of the right-hand side array occupied by fuel grain unknowns;
+    # fuel temperature time derivatives are calculated for all fuel rods at once in B1 (calculate_fuelrod_dtdt)
+    def calculate_rhs(self, indx, indxfuelrod, reactor, t, out):
 
-        # construct right-hand side list
-        rhs = []
         if 'fuelgrain' in reactor.solve and indx == 0 and indxfuelrod == 0:
             for i in range(self.nr):
                 if i == 0:
-                    rhs += self.fuelgrain[indx].calculate_rhs(reactor, t)
-
-        # FUEL PROPERTIES:
-        self.prop = {'rho':[], 'cp':[], 'k':[]}
-        for j in range(self.nr):
-            # call material property function
-            pro = reactor.data.matpro( {'type':self.type, 't':self.temp[j], 'b':self.b[j], 'por':self.por[j], 'pu':self.pu[j], 'x':self.x[j]} )
-            # density (kg/m3)
-            self.prop['rho'].append(pro['rho'])
-            # specific heat (J/kg-K)
-            self.prop['cp'].append(pro['cp'])
-            # thermal conductivity (W/m-K)
-            self.prop['k'].append(pro['k'])
-
-        # TIME DERIVATIVE OF FUEL TEMPERATURE:
-        # inner gas object
-        innergas = reactor.solid.fuelrod[indxfuelrod].innergas
-        # gap conductance list
-        hgap = innergas.calculate_hgap(indxfuelrod, reactor, t)
+                    rhsgrain = self.fuelgrain[indx].calculate_rhs(reactor, t)
+                    out[:len(rhsgrain)] = rhsgrain
+
+    #----------------------------------------------------------------------------------------------
+    # fill Jacobian columns of fuel temperatures: self is a 'fuel' object created in B1B
+    # indx is the axial index of this object in the fuel rod with index indxfuelrod,
+    # material properties and gap conductance are taken from the last call of the right-hand side
+    def calculate_jac(self, indx, indxfuelrod, reactor, jac):
+
+        # index of the first fuel temperature in the array of unknowns
+        iy = reactor.control.yindx[('fuel', indxfuelrod, indx)]
+        # index of the first clad temperature in the array of unknowns
+        iyclad = reactor.control.yindx[('clad', indxfuelrod, indx)]
         # clad object
         clad = reactor.solid.fuelrod[indxfuelrod].clad[indx]
 
-        # fuel thermal conductivity between nodes
-        kb = [0.5*(self.prop['k'][i] + self.prop['k'][i+1]) for i in range(self.nr-1)]
-        # heat flux (W/m**2) times heat transfer area per unit height at node boundaries: 2*rb * kb * dT/dr (size = nr-1)
-        Q = [0] + [2*math.pi*self.rb[i]*kb[i]*(self.temp[i] - self.temp[i+1])/self.dr for i in range(self.nr-1)]
-        # add heat flux (W/m**2) times heat transfer area per unit height from fuel to clad 
-        Q += [math.pi*(self.ro + clad.ri) * hgap[indx] * (self.temp[self.nr-1] - clad.temp[0])]
-        # power density
-        qv = reactor.core.qv_average * self.kr * self.kz
-        rhocpv = [self.prop['rho'][i]*self.prop['cp'][i]*self.vol[i] for i in range(self.nr)]
-        dTdt = [(Q[i] - Q[i+1] + qv*self.vol[i])/rhocpv[i] for i in range(self.nr)]
-        rhs += dTdt
-
-        return rhs
+        # thermal conductance per unit height between nodes with fuel thermal conductivity between nodes (size = nr-1)
+        g = 2*math.pi*self.rb*0.5*(self.prop['k'][:-1] + self.prop['k'][1:])/self.dr
+        # thermal conductance per unit height from fuel to clad
+        ggap = math.pi*(self.ro + clad.ri) * reactor.solid.fuelrod[indxfuelrod].innergas.hgap[indx]
+        rhocpv = self.prop['rho']*self.prop['cp']*self.vol
+
+        # derivatives of fuel temperature time derivatives (frozen material properties): tridiagonal stencil
+        # indexes of temperatures in the array of unknowns
+        iyr = numpy.arange(iy, iy+self.nr)
+        jac[iyr[:-1], iyr[:-1]] -= g/rhocpv[:-1]
+        jac[iyr[:-1], iyr[1:]] += g/rhocpv[:-1]
+        jac[iyr[1:], iyr[1:]] -= g/rhocpv[1:]
+        jac[iyr[1:], iyr[:-1]] += g/rhocpv[1:]
+        jac[iy+self.nr-1][iy+self.nr-1] -= ggap/rhocpv[self.nr-1]
+        # derivative of inner clad temperature time derivative
+        jac[iyclad][iy+self.nr-1] += ggap/(clad.prop['rho'][0]*clad.prop['cp'][0]*clad.vol[0])
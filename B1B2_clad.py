@@ -1,6 +1,33 @@
+from B4_data import ss316
+
+from numba import njit
+
 import math
+import numpy
 import sys
 
+#--------------------------------------------------------------------------------------------------
+# time derivatives of clad temperatures compiled by numba: temp is an array of temperatures in clad
+# radial nodes, rb and vol are arrays of node boundary radii and node volumes, qgap and qhex are heat 
+# fluxes times heat transfer area per unit height from fuel to clad and from clad to coolant; rho, cp, k
+# and dtdt are output arrays of clad properties and temperature time derivatives
+@njit(cache=True, fastmath=True)
+def calculate_dtdt(temp, rb, vol, dr, qgap, qhex, rho, cp, k, dtdt):
+
+    nr = len(temp)
+    # CLAD PROPERTIES:
+    for i in range(nr):
+        rho[i], cp[i], k[i] = ss316(temp[i])
+
+    # TIME DERIVATIVE OF CLAD TEMPERATURE:
+    # heat flux (W/m**2) times heat transfer area per unit height at node boundaries (size = nr+1): qgap at the
+    # inner surface, 2*pi*rb * kb * dT/dr with clad thermal conductivity between nodes kb inside and qhex at the outer surface
+    q = numpy.empty(nr+1)
+    q[0] = qgap
+    q[1:nr] = 2*math.pi*rb*0.5*(k[:-1] + k[1:])*(temp[:-1] - temp[1:])/dr
+    q[nr] = qhex
+    dtdt[:] = (q[:-1] - q[1:])/(rho*cp*vol)
+
 #--------------------------------------------------------------------------------------------------
 class Clad:
 
@@ -18,6 +45,8 @@ class Clad:
         self.p2d = dictfuelrod['p2d'][indx]
         # fuel rod multiplicity
         self.mltpl = dictfuelrod['mltpl'][indx]
+        # indexes of the pipe and pipe node cooling the clad
+        self.jpipe = (reactor.fluid.pipeid.index(dictfuelrod['pipeid'][indx]), dictfuelrod['pipenode'][indx]-1)
 
         # list of clad dictionaries specified in input
         list = reactor.control.input['clad']
@@ -43,56 +72,32 @@ class Clad:
         mat = reactor.control.input['mat'][iclad]
         # material type of clad
         self.type = mat['type']
-        # list of initial temperatures in clad radial nodes
+        if self.type != 'ss316':
+            print('****ERROR: clad material id ' + matid + ' is of type ' + self.type + ' while only ss316 clad is supported.')
+            sys.exit()
+        # list of initial temperatures in clad radial nodes (replaced by a view to the solid.clad_temp array)
         self.temp = [mat['temp0']]*self.nr
 
         # mesh grid step
         self.dr = (self.ro - self.ri)/(self.nr-1)
         # list of node radii (size = nr)
         self.r = [self.ri + i*self.dr for i in range(self.nr)]
-        # list of node boundary radii (size = nr-1)
-        self.rb = [self.r[i]+self.dr/2 for i in range(self.nr-1)]
-        # list of node volume (size = nr)
+        # array of node boundary radii (size = nr-1)
+        self.rb = numpy.array([self.r[i]+self.dr/2 for i in range(self.nr-1)])
+        # array of node volume (size = nr)
         self.vol = [self.rb[0]**2 - self.r[0]**2] + [self.rb[i]**2 - self.rb[i-1]**2 for i in range(1, self.nr-1)] + [self.r[self.nr-1]**2 - self.rb[self.nr-2]**2]
-        self.vol = [self.vol[i]*math.pi for i in range(self.nr)]
+        self.vol = numpy.array([self.vol[i]*math.pi for i in range(self.nr)])
+        # arrays of clad properties in radial nodes updated by calculate_fuelrod_dtdt (replaced by views to the solid.clad_prop arrays)
+        self.prop = {'rho':numpy.zeros(self.nr), 'cp':numpy.zeros(self.nr), 'k':numpy.zeros(self.nr)}
 
     #----------------------------------------------------------------------------------------------
-    # create right-hand side list: self is a 'clad' object created in B1B
-    # indx is the axial index of this object in the fuel rod with index indxfuelrod
-    def calculate_rhs(self, indx, indxfuelrod, reactor, t):
-
-        # CLAD PROPERTIES:
-        self.prop = {'rho':[], 'cp':[], 'k':[]}
-        for j in range(self.nr):
-            t = self.temp[j]
-            # call material property function
-            pro = reactor.data.matpro( {'type':self.type, 't':self.temp[j]} )
-            # density (kg/m3)
-            self.prop['rho'].append(pro['rho'])
-            # specific heat (J/kg-K)
-            self.prop['cp'].append(pro['cp'])
-            # thermal conductivity (W/m-K)
-            self.prop['k'].append(pro['k'])
-
-        # TIME DERIVATIVE OF CLAD TEMPERATURE:
-        # fuel object
-        fuel = reactor.solid.fuelrod[indxfuelrod].fuel[indx]
-        # inner gas object
-        innergas = reactor.solid.fuelrod[indxfuelrod].innergas
-        # gap conductance list
-        hgap = innergas.calculate_hgap(indxfuelrod, reactor, t)
-
-        # clad thermal conductivity between nodes
-        kb = [0.5*(self.prop['k'][i] + self.prop['k'][i+1]) for i in range(self.nr-1)]
-        # heat flux (W/m**2) times heat transfer area per unit height from fuel to clad
-        Q = [math.pi*(fuel.ro + self.ri) * hgap[indx] * (fuel.temp[fuel.nr-1] - self.temp[0])]
-        # heat flux (W/m**2) times heat transfer area per unit height divided by pi at node boundaries: 2*rb * kb * dT/dr (size = nr-1)
-        Q += [2*math.pi*self.rb[i]*kb[i]*(self.temp[i] - self.temp[i+1])/self.dr for i in range(self.nr-1)]
+    # calculate heat exchange coefficient from clad to coolant: self is a 'clad' object created in B1B
+    # indx is the axial index of this object in the fuel rod with index indxfuelrod; returns coolant temperature,
+    # clad temperature time derivatives are calculated for all fuel rods at once in B1 (calculate_fuelrod_dtdt)
+    def calculate_hex(self, indx, indxfuelrod, reactor):
 
-        # dictionary of the fuel rod to which the clad belongs
-        dictfuelrod = reactor.control.input['fuelrod'][indxfuelrod]
         # pipe node indexes
-        jpipe = (reactor.fluid.pipeid.index(dictfuelrod['pipeid'][indx]), dictfuelrod['pipenode'][indx]-1)
+        jpipe = self.jpipe
         fluid = {}
         fluid['t'] = reactor.fluid.temp[jpipe[0]][jpipe[1]]
         fluid['type'] = reactor.fluid.type[jpipe[0]]
@@ -102,11 +107,46 @@ class Clad:
         fluid['nu'] = reactor.data.nu( {'pe':fluid['pe'], 'p2d':self.p2d} )
         # heat exchange coefficient
         fluid['hex'] = fluid['nu'] * pro['kl'] / reactor.fluid.dhyd[jpipe[0]]
-        # heat flux (W/m**2) times heat transfer area per unit height divided by pi from clad to coolant
-        Q += [2*math.pi*self.ro * fluid['hex']*(self.temp[self.nr-1] - fluid['t'])]
+        # store heat exchange coefficient for calculate_jac
+        self.hex = fluid['hex']
+        return fluid['t']
+
+    #----------------------------------------------------------------------------------------------
+    # fill Jacobian columns of clad temperatures: self is a 'clad' object created in B1B
+    # indx is the axial index of this object in the fuel rod with index indxfuelrod,
+    # material properties and heat exchange coefficients are taken from the last call of the right-hand side
+    def calculate_jac(self, indx, indxfuelrod, reactor, jac):
+
+        # index of the first clad temperature in the array of unknowns
+        iy = reactor.control.yindx[('clad', indxfuelrod, indx)]
+        # index of the first fuel temperature in the array of unknowns
+        iyfuel = reactor.control.yindx[('fuel', indxfuelrod, indx)]
+        # fuel object
+        fuel = reactor.solid.fuelrod[indxfuelrod].fuel[indx]
+
+        # thermal conductance per unit height between nodes with clad thermal conductivity between nodes (size = nr-1)
+        g = 2*math.pi*self.rb*0.5*(self.prop['k'][:-1] + self.prop['k'][1:])/self.dr
+        # thermal conductance per unit height from fuel to clad
+        ggap = math.pi*(fuel.ro + self.ri) * reactor.solid.fuelrod[indxfuelrod].innergas.hgap[indx]
+        # thermal conductance per unit height from clad to coolant
+        ghex = 2*math.pi*self.ro * self.hex
+        rhocpv = self.prop['rho']*self.prop['cp']*self.vol
 
-        rhocpv = [self.prop['rho'][i]*self.prop['cp'][i]*self.vol[i] for i in range(self.nr)]
-        dTdt = [(Q[i] - Q[i+1])/rhocpv[i] for i in range(self.nr)]
-        rhs = dTdt
+        # derivatives of clad temperature time derivatives (frozen material properties): tridiagonal stencil
+        jac[iy][iy] -= ggap/rhocpv[0]
+        # indexes of temperatures in the array of unknowns
+        iyr = numpy.arange(iy, iy+self.nr)
+        jac[iyr[:-1], iyr[:-1]] -= g/rhocpv[:-1]
+        jac[iyr[:-1], iyr[1:]] += g/rhocpv[:-1]
+        jac[iyr[1:], iyr[1:]] -= g/rhocpv[1:]
+        jac[iyr[1:], iyr[:-1]] += g/rhocpv[1:]
+        jac[iy+self.nr-1][iy+self.nr-1] -= ghex/rhocpv[self.nr-1]
+        # derivative of outer fuel temperature time derivative
+        jac[iyfuel+fuel.nr-1][iy] += ggap/(fuel.prop['rho'][fuel.nr-1]*fuel.prop['cp'][fuel.nr-1]*fuel.vol[fuel.nr-1])
 
-        return rhs
+        # derivative of coolant temperature time derivative
+        jpipe = self.jpipe
+        if reactor.fluid.signaltemp[jpipe[0]] == '':
+            dz = abs(reactor.fluid.len[jpipe[0]])/reactor.fluid.pipennodes[jpipe[0]]
+            rho_cp_vol = reactor.fluid.prop[jpipe[0]]['rhol'][jpipe[1]] * reactor.fluid.prop[jpipe[0]]['cpl'][jpipe[1]] * reactor.fluid.areaz[jpipe[0]] * dz
+            jac[reactor.control.yindx[('fluidtemp', jpipe[0])] + jpipe[1]][iy+self.nr-1] += ghex * dz * self.mltpl / rho_cp_vol
@@ -1,3 +1,4 @@
+import math
 import sys
 
 from B1B0_fuel import Fuel
@@ -52,13 +53,35 @@ class FuelRod:
             self.clad.append(Clad(i, indx, reactor))
 
     #----------------------------------------------------------------------------------------------
-    # compose right-hand side list: self is a 'fuelrod' object created in B1,
+    # compose right-hand side array of fuel grain unknowns and boundary conditions of fuel and clad temperature
+    # time derivatives: self is a 'fuelrod' object created in B1, indx is the fuel rod index, out is the slice
+    # of the right-hand side array occupied by solid unknowns and n0 is the index of the first solid unknown
+    # in the array of unknowns; fuel and clad temperature time derivatives are calculated by solid
+    def compose_rhs(self, indx, reactor, t, out, n0):
+
+        yindx = reactor.control.yindx
+        solid = reactor.solid
+        # gap conductances of all axial layers
+        hgap = self.innergas.calculate_hgap(indx, reactor, t)
+        for i in range(self.nz):
+            # fuel grain unknowns (if any) precede fuel temperatures
+            if ('fuelgrain', indx, i) in yindx:
+                self.fuel[i].calculate_rhs(i, indx, reactor, t, out[yindx[('fuelgrain', indx, i)] - n0:yindx[('fuel', indx, i)] - n0])
+            # index of the axial layer in the arrays of boundary conditions of solid
+            l = self.layer0 + i
+            # thermal conductance per unit height from fuel to clad
+            solid.ggap[l] = math.pi*(self.fuel[i].ro + self.clad[i].ri) * hgap[i]
+            # power density
+            solid.qv[l] = reactor.core.qv_average * self.fuel[i].kr * self.fuel[i].kz
+            # coolant temperature and thermal conductance per unit height from clad to coolant
+            solid.tcool[l] = self.clad[i].calculate_hex(i, indx, reactor)
+            solid.ghex[l] = 2*math.pi*self.clad[i].ro * self.clad[i].hex
+
+    #----------------------------------------------------------------------------------------------
+    # fill Jacobian columns of fuel and clad temperatures: self is a 'fuelrod' object created in B1,
     # indx is the fuel rod index
-    def compose_rhs(self, indx, reactor, t):
+    def compose_jac(self, indx, reactor, jac):
 
-        # construct right-hand side list
-        rhs = []
         for i in range(self.nz):
-            rhs += self.fuel[i].calculate_rhs(i, indx, reactor, t)
-            rhs += self.clad[i].calculate_rhs(i, indx, reactor, t)
-        return rhs
+            self.fuel[i].calculate_jac(i, indx, reactor, jac)
+            self.clad[i].calculate_jac(i, indx, reactor, jac)
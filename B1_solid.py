@@ -1,5 +1,34 @@
 from B1A_heatstructure import HeatStructure
 from B1B_fuelrod import FuelRod
+from B1B0_fuel import calculate_dtdt as calculate_fuel_dtdt
+from B1B2_clad import calculate_dtdt as calculate_clad_dtdt
+
+from numba import njit, prange
+
+import numpy
+
+#--------------------------------------------------------------------------------------------------
+# time derivatives of fuel and clad temperatures of all axial layers of all fuel rods compiled by numba
+# and calculated in parallel (axial layers are independent as coolant temperatures are fixed during the
+# call): fuel and clad are tuples of flat arrays packed by Solid.pack (offsets of axial layers followed by
+# arrays of temperatures, parameters, geometry, mesh grid steps, properties and output time derivatives),
+# ggap and ghex are arrays of thermal conductances per unit height from fuel to clad and from clad to
+# coolant, qv is an array of power densities and tcool is an array of coolant temperatures in axial layers
+@njit(parallel=True, cache=True)
+def calculate_fuelrod_dtdt(fuel, clad, ggap, ghex, qv, tcool):
+
+    offset, temp, b, por, pu, x, rb, vol, dr, rho, cp, k, dtdt = fuel
+    offsetc, tempc, rbc, volc, drc, rhoc, cpc, kc, dtdtc = clad
+    for l in prange(len(dr)):
+        # fuel and clad nodes of axial layer l (node boundaries of axial layer l start at i0-l and j0-l)
+        i0, i1 = offset[l], offset[l+1]
+        j0, j1 = offsetc[l], offsetc[l+1]
+        # heat flux (W/m**2) times heat transfer area per unit height from fuel to clad and from clad to coolant
+        qgap = ggap[l]*(temp[i1-1] - tempc[j0])
+        qhex = ghex[l]*(tempc[j1-1] - tcool[l])
+        calculate_fuel_dtdt(temp[i0:i1], b[i0:i1], por[i0:i1], pu[i0:i1], x[i0:i1], rb[i0-l:i1-l-1], vol[i0:i1], dr[l], qgap, qv[l], \
+                            rho[i0:i1], cp[i0:i1], k[i0:i1], dtdt[i0:i1])
+        calculate_clad_dtdt(tempc[j0:j1], rbc[j0-l:j1-l-1], volc[j0:j1], drc[l], qgap, qhex, rhoc[j0:j1], cpc[j0:j1], kc[j0:j1], dtdtc[j0:j1])
 
 #--------------------------------------------------------------------------------------------------
 class Solid:
@@ -16,6 +45,33 @@ class Solid:
             self.fuelrod = []
             for i in range(self.nfuelrods):
                 self.fuelrod.append(FuelRod(i, reactor))
+            # fuel and clad objects of all axial layers of all fuel rods
+            fuel = []
+            clad = []
+            for i in range(self.nfuelrods):
+                # index of the first axial layer of the fuel rod in the list of axial layers
+                self.fuelrod[i].layer0 = len(fuel)
+                fuel += self.fuelrod[i].fuel
+                clad += self.fuelrod[i].clad
+            # temperatures, parameters, geometry, properties and temperature time derivatives of all fuel and clad
+            # radial nodes stored in flat arrays ordered by fuel rod, axial layer and radial node; fuel and clad
+            # objects keep views to these arrays
+            f, self.fuel_offset = self.pack(fuel, ['temp', 'b', 'por', 'pu', 'x', 'rb', 'vol'])
+            c, self.clad_offset = self.pack(clad, ['temp', 'rb', 'vol'])
+            self.fuel_temp = f['temp']
+            self.fuel_prop = {'rho':f['rho'], 'cp':f['cp'], 'k':f['k']}
+            self.fuel_dtdt = f['dtdt']
+            self.clad_temp = c['temp']
+            self.clad_prop = {'rho':c['rho'], 'cp':c['cp'], 'k':c['k']}
+            self.clad_dtdt = c['dtdt']
+            # boundary conditions of axial layers updated by fuel rods at every call of compose_rhs
+            self.ggap = numpy.zeros(len(fuel))
+            self.ghex = numpy.zeros(len(fuel))
+            self.qv = numpy.zeros(len(fuel))
+            self.tcool = numpy.zeros(len(fuel))
+            # arguments of calculate_fuelrod_dtdt
+            self.fuel_args = (self.fuel_offset, f['temp'], f['b'], f['por'], f['pu'], f['x'], f['rb'], f['vol'], numpy.array([x.dr for x in fuel]), f['rho'], f['cp'], f['k'], f['dtdt'])
+            self.clad_args = (self.clad_offset, c['temp'], c['rb'], c['vol'], numpy.array([x.dr for x in clad]), c['rho'], c['cp'], c['k'], c['dtdt'])
 
         if 'htstr' in reactor.solve:
             # number of heat structures specified in input
@@ -26,16 +82,60 @@ class Solid:
                 self.htstr.append(HeatStructure(i, reactor))
 
     #----------------------------------------------------------------------------------------------
-    # compose right-hand side list: self is a 'solid' object created in B
-    def compose_rhs(self, reactor, t):
+    # pack node arrays of fuel or clad objects to flat arrays: self is a 'solid' object created in B, objs is a
+    # list of 'fuel' or 'clad' objects of all axial layers and keys is a list of names of their node arrays;
+    # returns dictionary of flat arrays (also of properties 'rho', 'cp', 'k' and of temperature time derivatives
+    # 'dtdt') and array of indexes of the first radial node of every object (size = number of objects + 1);
+    # node boundary radii 'rb' (size = nr-1) of object l start at index offset[l] - l
+    def pack(self, objs, keys):
+
+        offset = numpy.zeros(len(objs)+1, dtype=int)
+        for l in range(len(objs)):
+            offset[l+1] = offset[l] + objs[l].nr
+        arrays = {}
+        for key in keys + ['rho', 'cp', 'k', 'dtdt']:
+            arrays[key] = numpy.zeros(offset[-1] - len(objs) if key == 'rb' else offset[-1])
+        for l in range(len(objs)):
+            obj = vars(objs[l])
+            s = slice(offset[l], offset[l+1])
+            # replace object's own node arrays and properties with views to the flat arrays
+            for key in keys:
+                sb = slice(offset[l] - l, offset[l+1] - l - 1) if key == 'rb' else s
+                arrays[key][sb] = obj[key]
+                obj[key] = arrays[key][sb]
+            for key in ['rho', 'cp', 'k']:
+                obj['prop'][key] = arrays[key][s]
+        return arrays, offset
+
+    #----------------------------------------------------------------------------------------------
+    # compose right-hand side array: self is a 'solid' object created in B,
+    # out is the slice of the right-hand side array occupied by solid unknowns
+    def compose_rhs(self, reactor, t, out):
+
+        # index of the first solid unknown in the array of unknowns
+        n0 = reactor.control.yslice['solid'].start
+        if 'fuelrod' in reactor.solve:
+            # fuel grain unknowns and boundary conditions of axial layers
+            for i in range(self.nfuelrods):
+                self.fuelrod[i].compose_rhs(i, reactor, t, out, n0)
+            # fuel and clad properties and temperature time derivatives of all axial layers
+            calculate_fuelrod_dtdt(self.fuel_args, self.clad_args, self.ggap, self.ghex, self.qv, self.tcool)
+            out[reactor.control.yfuel - n0] = self.fuel_dtdt
+            out[reactor.control.yclad - n0] = self.clad_dtdt
+
+        if 'htstr' in reactor.solve:
+            for i in range(self.nhtstr):
+                j = reactor.control.yindx[('htstr', i)] - n0
+                self.htstr[i].compose_rhs(reactor, t, out[j:j+self.htstr[i].nr])
+
+    #----------------------------------------------------------------------------------------------
+    # fill Jacobian columns of solid unknowns: self is a 'solid' object created in B
+    def compose_jac(self, reactor, jac):
 
-        # construct right-hand side list
-        rhs = []
         if 'fuelrod' in reactor.solve:
             for i in range(self.nfuelrods):
-                rhs += self.fuelrod[i].compose_rhs(i, reactor, t)
+                self.fuelrod[i].compose_jac(i, reactor, jac)
 
         if 'htstr' in reactor.solve:
             for i in range(self.nhtstr):
-                rhs += self.htstr[i].compose_rhs(reactor, t)
-        return rhs
+                self.htstr[i].compose_jac(i, reactor, jac)
@@ -115,6 +115,16 @@ class Fluid:
         self.junflowrate = reactor.control.input['junflowrate']
         # user-specified junction k-factor signal
         self.junkfac = reactor.control.input['junkfac']
+        # indexes of every junction in the junkfac, junpumphead and junflowrate lists (-1 if absent)
+        self.ijunkfac = []
+        self.ijunpumphead = []
+        self.ijunflowrate = []
+        for j in range(self.njun):
+            # tuple of from-to pipe id's
+            f_t = (self.pipeid[self.f[j][0]],self.pipeid[self.t[j][0]])
+            self.ijunkfac.append(self.junkfac['jun'].index(f_t) if f_t in self.junkfac['jun'] else -1)
+            self.ijunpumphead.append(self.junpumphead['jun'].index(f_t) if f_t in self.junpumphead['jun'] else -1)
+            self.ijunflowrate.append(self.junflowrate['jun'].index(f_t) if f_t in self.junflowrate['jun'] else -1)
 
         # create and inverse a matrix A linking dependent and independent junctions
         A = [[0]*(self.njuni+self.njund) for i in range(self.njuni+self.njund)]
@@ -200,12 +210,12 @@ class Fluid:
                     print('****ERROR: pipe node index (' + str(jpipe[1]) + ') given in \'thermbc\' card (' + x['id'] + ') exceeds number of nodes (' + str(self.pipennodes[ipipe]) + ') of pipe ' + jpipe[0])
                     sys.exit()
     #----------------------------------------------------------------------------------------------
-    # create right-hand side list: self is a 'fluid' object created in B
-    def calculate_rhs(self, reactor, t):
+    # create right-hand side array: self is a 'fluid' object created in B,
+    # out is the slice of the right-hand side array occupied by fluid unknowns
+    def calculate_rhs(self, reactor, t, out):
 
         if 'fluid' not in reactor.solve:
-            rhs = []
-            return rhs
+            return
 
         # FLUID PROPERTIES:
         self.prop = []
@@ -281,31 +291,21 @@ class Fluid:
             dpfric_t = reactor.data.fricfac(self.re[t[0]][t[1]]) * 0.5 * rho_t * self.vel[t[0]][t[1]] * abs(self.vel[t[0]][t[1]])
             
             b[j] = -(rhogh_f + rhogh_t) - (dpfric_f + dpfric_t)
-            try:
-                # check if the current junction j is present in junkfac list
-                indx = reactor.fluid.junkfac['jun'].index((self.pipeid[f[0]],self.pipeid[t[0]]))
-                # if yes...
+            # check if the current junction j is present in junkfac list
+            indx = self.ijunkfac[j]
+            if indx >= 0:
                 kfac = reactor.control.signal[self.junkfac['kfac'][indx]]
                 # local (singular) pressure losses
                 if self.mdot[j] > 0:
                     b[j] -= kfac * rho_f * self.vel[f[0]][f[1]]**2 / 2.0
                 else:
                     b[j] += kfac * rho_t * self.vel[t[0]][t[1]]**2 / 2.0
-                
-            except ValueError:
-                pass
             if self.juntype[j] == 'independent':
-                try:
-                    # check if the current junction j is present in junpumphead list
-                    indx = reactor.fluid.junpumphead['jun'].index((f,t))
-                    # if yes...
+                # check if the current junction j is present in junpumphead list
+                indx = self.ijunpumphead[j]
+                if indx >= 0:
                     b[j] += reactor.control.signal[self.junpumphead['pumphead'][indx]]
-                except ValueError:
-                    pass
 
-        for i in range(self.npipe):
-            for j in range(self.pipennodes[i]):
-                self.indx.append((i,j))
         for i in range(sum(self.pipennodes)):
             n = self.indx[i][0]
             if self.pipetype[n] == 'freelevel': b[self.njun+i] = self.p0[i]
@@ -315,16 +315,10 @@ class Fluid:
         dmdotdt = []
         for j in range(self.njun):
             if self.juntype[j] == 'independent':
-                f = reactor.fluid.f[j][0]
-                t = reactor.fluid.t[j][0]
-                # tuple of from-to pipe id's
-                f_t = (reactor.fluid.pipeid[f],reactor.fluid.pipeid[t])
-                try:
-                    # check if the current junction j is present in junflowrate list
-                    indx = reactor.fluid.junflowrate['jun'].index(f_t)
-                    # if yes...
+                # check if the current junction j is present in junflowrate list
+                if self.ijunflowrate[j] >= 0:
                     dmdotdt.append(0)
-                except ValueError:
+                else:
                     dmdotdt.append(invBb[j])
         # read from invBb: pressures in pipe nodes
         indx = 0
@@ -407,5 +401,5 @@ class Fluid:
                     rho_cp_vol = self.prop[i]['rhol'][j] * self.prop[i]['cpl'][j] * vol
                     dtempdt.append(dtempdt2d[i][j] / rho_cp_vol)
 
-        rhs = dmdotdt + dlendt + dtempdt
-        return rhs
+        # write time derivatives of flowrates, free-level-volume lengths and temperatures to out
+        out[:] = dmdotdt + dlendt + dtempdt
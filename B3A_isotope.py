@@ -1,7 +1,12 @@
+import json
 import os
 import sys
 import time
 
+# version of the cross section cache format: to be incremented whenever the processing of the isotope data
+# file changes, so that caches written by older versions are not used
+CACHE_VERSION = 1
+
 #--------------------------------------------------------------------------------------------------
 class Isotope:
 
@@ -15,8 +20,23 @@ class Isotope:
         # isotope is
         self.isoid = isoid
 
+        # cross sections processed from the isotope data file are cached in a json file next to it and loaded
+        # instead of parsing the data file if the cache is valid (see read_cache)
+        path = nddir + os.sep + self.isoid
+        cache = path + '.json'
+        data = read_cache(cache, path)
+        if data is not None:
+            ng, self.temp, self.sig0, self.xs = data['ng'], data['temp'], data['sig0'], data['xs']
+            if ng != reactor.control.input['ng']:
+                print('****ERROR: number of energy group (' + str(ng) + ') in ' + cache + ' not equal to number of energy group specified in input card solve spatialkinetics (' + str(reactor.control.input['ng']) + ').')
+                sys.exit()
+            tac = time.time()
+            print('{0:.3f}'.format(tac - reactor.tic), ' s | isotope cross sections loaded: ', cache)
+            reactor.tic = tac
+            return
+
         # open, read line by line and close the isotope data file
-        f = open(nddir + os.sep + self.isoid, 'r')
+        f = open(path, 'r')
         s = f.readline()
         cards = []
         end = False
@@ -146,10 +166,49 @@ class Isotope:
             for i in range(len(sign2n)):
                 self.xs['n2n'].append(sign2n[i])
 
+        # write the cache
+        write_cache(cache, {'version':CACHE_VERSION, 'ng':ng, 'temp':self.temp, 'sig0':self.sig0, 'xs':self.xs})
+
         tac = time.time()
         print('{0:.3f}'.format(tac - reactor.tic), ' s | isotope cross sections processed: ', nddir + os.sep + self.isoid)
         reactor.tic = tac
 
+#----------------------------------------------------------------------------------------------
+# The function reads the cross section cache of the isotope data file path and returns the dictionary
+# written by write_cache, or None if the cache does not exist, is older than the data file, was written by
+# another version of the cache format or cannot be read (e.g. truncated)
+
+def read_cache(cache, path):
+    if not os.path.isfile(cache) or os.path.getmtime(cache) < os.path.getmtime(path):
+        return None
+    try:
+        with open(cache, 'r') as f:
+            data = json.load(f)
+        if data['version'] != CACHE_VERSION:
+            return None
+        # json stores (from, to) tuples of scattering matrices as lists: convert them back to tuples
+        for s in data['xs']['ine'] + data['xs']['n2n'] + [s for elan in data['xs']['elan'] for s in elan]:
+            s[0] = tuple(s[0])
+    except (OSError, ValueError, KeyError, IndexError, TypeError):
+        return None
+    return data
+
+#----------------------------------------------------------------------------------------------
+# The function writes dictionary data to the cross section cache: the data is written to a temporary file
+# unique for the process, which then replaces the cache in one step, so that runs sharing the nuclear data
+# directory never see a partially written cache. the cache is skipped if it cannot be written (e.g. the
+# nuclear data directory is not writable)
+
+def write_cache(cache, data):
+    tmp = cache + '.' + str(os.getpid()) + '.tmp'
+    try:
+        with open(tmp, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp, cache)
+    except OSError:
+        if os.path.isfile(tmp):
+            os.remove(tmp)
+
 #----------------------------------------------------------------------------------------------
 # The function reads n words from row irow of matrix cards and returns them in
 # vector a together with the new row number irownew, i.e. the row where the last word was read.
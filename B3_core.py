@@ -309,21 +309,21 @@ class Core:
                                     self.cdnp[iz][ix][iy][it][im] = self.betaeff[im]*qf/self.keff[0]/self.dnplmb[im]
 
     #----------------------------------------------------------------------------------------------
-    # create right-hand side list: self is a 'core' object created in B
-    def calculate_rhs(self, reactor, t):
+    # create right-hand side array: self is a 'core' object created in B,
+    # out is the slice of the right-hand side array occupied by core unknowns
+    def calculate_rhs(self, reactor, t, out):
 
-        # construct right-hand side list
-        rhs = []
+        # index of the current unknown in out
+        k = 0
         if 'pointkinetics' in reactor.solve:
-            self.qv_average = self.power/self.fuelvol
             # read input parameters
             rho = reactor.control.signal['RHO_INS']
             dpowerdt = self.power * (rho - sum(self.betaeff)) / self.tlife
-            dcdnpdt = [0] * self.ndnp
             for i in range(self.ndnp) :
                 dpowerdt += self.dnplmb[i]*self.cdnp[i]
-                dcdnpdt[i] = self.betaeff[i]*self.power/self.tlife - self.dnplmb[i]*self.cdnp[i]
-            rhs = [dpowerdt] + dcdnpdt
+                out[1+i] = self.betaeff[i]*self.power/self.tlife - self.dnplmb[i]*self.cdnp[i]
+            out[0] = dpowerdt
+            k = 1 + self.ndnp
 
         if 'spatialkinetics' in reactor.solve:
             for i in range(self.nmix):
@@ -399,7 +399,8 @@ class Core:
                         if imix >= 0:
                             for it in range(self.nt):
                                 for ig in range(self.ng):
-                                    rhs += [self.dfidt[iz][ix][iy][it][ig]]
+                                    out[k] = self.dfidt[iz][ix][iy][it][ig]
+                                    k += 1
 
             for iz in range(self.nz):
                 for ix in range(self.nx):
@@ -409,6 +410,20 @@ class Core:
                         if imix >= 0:
                             for it in range(self.nt):
                                 for im in range(self.ndnp):
-                                    rhs += [self.dcdnpdt[iz][ix][iy][it][im]]
+                                    out[k] = self.dcdnpdt[iz][ix][iy][it][im]
+                                    k += 1
 
-        return rhs
+    #----------------------------------------------------------------------------------------------
+    # fill Jacobian columns of point kinetics unknowns: self is a 'core' object created in B
+    def calculate_jac(self, reactor, jac):
+
+        if 'pointkinetics' in reactor.solve:
+            # index of power in the array of unknowns, followed by delayed neutron precursor concentrations
+            iy = reactor.control.yindx['power']
+            # read input parameters
+            rho = reactor.control.signal['RHO_INS']
+            jac[iy][iy] = (rho - sum(self.betaeff)) / self.tlife
+            for i in range(self.ndnp) :
+                jac[iy][iy+1+i] = self.dnplmb[i]
+                jac[iy+1+i][iy] = self.betaeff[i]/self.tlife
+                jac[iy+1+i][iy+1+i] = -self.dnplmb[i]
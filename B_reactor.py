@@ -22,8 +22,11 @@ from B2_fluid import Fluid
 from B3_core import Core
 
 # SciPy requires installation : python -m pip install --user numpy scipy matplotlib ipython jupyter pandas sympy nose
-from scipy.integrate import ode
+# Numba requires installation : python -m pip install --user numba
+from scipy.integrate import LSODA
 
+import numpy
+import sys
 import time
 
 #--------------------------------------------------------------------------------------------------
@@ -55,25 +58,90 @@ class Reactor:
         # evaluate signals
         self.control.evaluate_signals(self, self.control.input['t0'])
 
-        # write list of unknowns from self to y0
+        # write array of unknowns from self to y0 and build the map of unknowns
         y0 = self.control.write_to_y(self)
+        # preallocated array of right-hand sides and slices occupied by fluid, solid and core
+        rhs = numpy.zeros(len(y0))
+        yslice = self.control.yslice
+
+        # methods and views of rhs used by compose_rhs do not change during the solution and are looked up
+        # once here instead of at every call
+        names = {'reactor':self, 'core':self.core, 'rhs':rhs,
+                 'read_from_y':self.control.read_from_y, 'evaluate_signals':self.control.evaluate_signals,
+                 'fluid_rhs':self.fluid.calculate_rhs, 'rhsfluid':rhs[yslice['fluid']],
+                 'solid_rhs':self.solid.compose_rhs, 'rhssolid':rhs[yslice['solid']],
+                 'core_rhs':self.core.calculate_rhs, 'rhscore':rhs[yslice['core']]}
 
         #------------------------------------------------------------------------------------------
-        # given t and y, function returns the list of the right-hand sides. called by the ODE solver
-        def compose_rhs(t, y):
+        # given t and y, function returns the array of the right-hand sides. called by the ODE solver.
+        # the source of the function is generated for the objects to be solved, so that it has no branches:
+        # the unknowns are read from y to self, signals are evaluated and every solved object writes to
+        # its own slice of rhs. with point kinetics, the average power density used by the fuel rods is updated
+        # from the power read from y before the solid right-hand side, so that the result depends on y only
+        src = 'def compose_rhs(t, y):\n'
+        src += '    read_from_y(reactor, y)\n'
+        src += '    evaluate_signals(reactor, t)\n'
+        if 'pointkinetics' in self.solve and 'fuelrod' in self.solve:
+            src += '    core.qv_average = core.power/core.fuelvol\n'
+        if 'fluid' in self.solve:
+            src += '    fluid_rhs(reactor, t, rhsfluid)\n'
+        if 'fuelrod' in self.solve or 'htstr' in self.solve:
+            src += '    solid_rhs(reactor, t, rhssolid)\n'
+        if 'pointkinetics' in self.solve or 'spatialkinetics' in self.solve:
+            src += '    core_rhs(reactor, t, rhscore)\n'
+        src += '    return rhs\n'
+        exec(src, names)
+        compose_rhs = names['compose_rhs']
+
+        # columns of the Jacobian without analytical derivatives: unknowns of fluid, of fuel grain and of spatial kinetics,
+        # and point kinetics power (which enters the fuel rows through the power density)
+        fdcols = list(range(yslice['fluid'].start, yslice['fluid'].stop))
+        if 'fuelgrain' in self.solve:
+            fdcols += range(self.control.yindx[('fuelgrain', 0, 0)], self.control.yindx[('fuel', 0, 0)])
+        if 'spatialkinetics' in self.solve:
+            fdcols += range(yslice['core'].start, yslice['core'].stop)
+        if 'pointkinetics' in self.solve:
+            fdcols.append(self.control.yindx['power'])
+        # columns with analytical derivatives, in which the derivative of the power time derivative through the
+        # reactivity signal (e.g. feedback from fuel and clad temperatures) is added by finite differences
+        rhocols = sorted(set(range(len(y0))) - set(fdcols))
 
-            # read list of unknowns from y to self
+        #------------------------------------------------------------------------------------------
+        # given t and y, function returns the Jacobian matrix of the right-hand sides. called by the ODE solver
+        def compose_jac(t, y):
+
+            # right-hand side at (t, y) also updates material properties and heat exchange coefficients
+            rhs0 = compose_rhs(t, y).copy()
+            jac = numpy.zeros((len(y), len(y)))
+
+            # columns of solid and point kinetics unknowns: analytical derivatives
+            self.solid.compose_jac(self, jac)
+            self.core.calculate_jac(self, jac)
+
+            # reactivity feedback: finite differences of the reactivity signal alone in the analytical columns
+            yp = numpy.array(y)
+            if 'pointkinetics' in self.solve:
+                ipower = self.control.yindx['power']
+                rho0 = self.control.signal['RHO_INS']
+                dpowerdtdrho = self.core.power/self.core.tlife
+                for j in rhocols:
+                    dy = 1.5e-8*max(abs(y[j]), 1.0)
+                    yp[j] = y[j] + dy
+                    self.control.read_from_y(self, yp)
+                    self.control.evaluate_signals(self, t)
+                    jac[ipower][j] += dpowerdtdrho*(self.control.signal['RHO_INS'] - rho0)/dy
+                    yp[j] = y[j]
+
+            # other columns: finite differences of the right-hand side
+            for j in fdcols:
+                dy = 1.5e-8*max(abs(y[j]), 1.0)
+                yp[j] = y[j] + dy
+                jac[:,j] = (compose_rhs(t, yp) - rhs0)/dy
+                yp[j] = y[j]
+            # restore unknowns and signals
             self.control.read_from_y(self, y)
-
-            # evaluate signals            
             self.control.evaluate_signals(self, t)
-
-            # compose right-hand side vector
-            rhs = []
-            rhs += self.fluid.calculate_rhs(self, t)
-            rhs += self.solid.compose_rhs(self, t)
-            rhs += self.core.calculate_rhs(self, t)
-            return rhs
+            return jac
 
         #------------------------------------------------------------------------------------------
         # prepare an output folder, copy input and open output files
@@ -81,19 +149,25 @@ class Reactor:
         t0 = self.control.input['t0']
         self.control.print_output_files(self, fid, t0)
 
-        # create ODE solver, initialize and set integrator
-        solver = ode(compose_rhs, jac = None).set_integrator('vode', method = 'bdf', rtol = self.control.input['tol'][0], atol = self.control.input['tol'][1])
-        solver.set_initial_value(y0, t0)
-        #solver.set_integrator
-
-        # main integration loop
-        dtout = 1e-6
+        # main integration loop: the LSODA solver switches automatically between nonstiff (Adams) and stiff
+        # (BDF) methods and is advanced by one internal step at a time, results are printed after every step
+        t = t0
+        y = y0
+        # relative and absolute tolerances are scalars applied uniformly to all unknowns
+        rtol, atol = self.control.input['tol']
         for tend in self.control.input['tend'] :
-            while solver.successful() and solver.t < tend:
-                t = min(tend, solver.t + dtout)
-                y = solver.integrate(t)
-                # next step recommended by the solver
-                dtout = solver._integrator.rwork[11]
+            if tend <= t:
+                continue
+            solver = LSODA(compose_rhs, t, y, tend, rtol = rtol, atol = atol, jac = compose_jac)
+            while solver.status == 'running':
+                message = solver.step()
+                if solver.status == 'failed':
+                    print('****ERROR: ODE solver failed at time ' + str(solver.t) + ' s: ' + str(message))
+                    sys.exit()
+                t = solver.t
+                y = solver.y
+                # read array of unknowns of the step from y to self
+                self.control.read_from_y(self, y)
             
                 # evaluate signals            
                 self.control.evaluate_signals(self, t)